@@ -0,0 +1,65 @@
+import threading
+import time
+from models import db, Category, CacheVersion
+
+CATEGORIES_VERSION_NAME = 'categories'
+
+
+class CategoryRegistry:
+    """
+    Cache em memória das categorias (nome -> id). Cada processo confere a linha de versão
+    'categories' no máximo a cada 'check_interval' segundos (uma busca por chave primária) e só
+    recarrega as categorias quando outro processo a incrementou.
+    """
+
+    def __init__(self, check_interval: float = 2.0):
+        self.check_interval = check_interval
+        self.version = None
+        self._ids_by_name = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _current_version(self) -> int:
+        row = db.session.get(CacheVersion, CATEGORIES_VERSION_NAME)
+        return row.version if row else 0
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self.version is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if self.version is not None and now - self._checked_at < self.check_interval:
+                return
+            version = self._current_version()
+            if version != self.version:
+                rows = db.session.query(Category.name, Category.id).order_by(Category.name).all()
+                self._ids_by_name = dict(rows)
+                self.version = version
+            self._checked_at = now
+
+    def names(self) -> list:
+        """Nomes das categorias em ordem alfabética."""
+        self._refresh()
+        return list(self._ids_by_name)
+
+    def get_id(self, name):
+        """Id da categoria com esse nome (None se não existir)."""
+        self._refresh()
+        return self._ids_by_name.get(name)
+
+    def default_id(self):
+        """Categoria usada quando a IA devolve um nome desconhecido (a mais antiga)."""
+        self._refresh()
+        return min(self._ids_by_name.values(), default=None)
+
+    def invalidate(self):
+        """
+        Incrementa a versão na transação atual (chame antes do commit que altera as categorias)
+        e descarta o cache local; os outros processos recarregam na próxima conferência.
+        """
+        updated = CacheVersion.query.filter_by(name=CATEGORIES_VERSION_NAME) \
+            .update({CacheVersion.version: CacheVersion.version + 1}, synchronize_session=False)
+        if not updated:
+            db.session.add(CacheVersion(name=CATEGORIES_VERSION_NAME, version=1))
+        with self._lock:
+            self.version = None
@@ -0,0 +1,124 @@
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from sqlalchemy import event
+from models import db, User, Ticket, TicketComment
+
+
+class QueryCounter:
+    """Conta os comandos SQL executados numa engine enquanto estiver ativo (por thread)."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.statements = []
+        self._thread_id = threading.get_ident()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread_id:
+            self.count += 1
+            self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        return False
+
+
+@contextmanager
+def assert_max_queries(engine, max_queries: int):
+    """Falha (AssertionError) se o bloco executar mais de 'max_queries' comandos SQL, ex: um N+1."""
+    with QueryCounter(engine) as counter:
+        yield counter
+    if counter.count > max_queries:
+        executed = "\n".join(f"  {statement}" for statement in counter.statements)
+        raise AssertionError(f"{counter.count} consultas executadas (máximo: {max_queries}):\n{executed}")
+
+
+def build_engine_options(database_uri: str, pool_size: int = 10, max_overflow: int = 20, pool_recycle: int = 1800,
+                         pool_timeout: int = 30, busy_timeout_ms: int = 5000) -> dict:
+    """Opções do create_engine para o banco configurado (SQLite em arquivo ou servidor com pool)."""
+    if database_uri.startswith('sqlite'):
+        options = {'connect_args': {'timeout': busy_timeout_ms / 1000}}
+        if ':memory:' not in database_uri and database_uri.rstrip('/') != 'sqlite:':
+            # Conexões SQLite são baratas: o pool só limita quantas threads escrevem/leem ao mesmo tempo
+            options.update(pool_size=pool_size, max_overflow=max_overflow, pool_timeout=pool_timeout)
+        return options
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_recycle': pool_recycle,  # Renova conexões antes do servidor/proxy derrubá-las por inatividade
+        'pool_timeout': pool_timeout,
+        'pool_pre_ping': True,  # Descarta conexões mortas (ex: reinício do banco) antes de usá-las
+    }
+
+
+def enable_sqlite_pragmas(engine, busy_timeout_ms: int = 5000):
+    """
+    Ajusta cada nova conexão SQLite: WAL (leitores não bloqueiam o escritor), synchronous=NORMAL
+    (seguro com WAL, bem menos fsync) e busy_timeout (espera o lock em vez de falhar com "database is locked").
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        cursor.close()
+
+
+def benchmark_ticket_writes(engine, writers: int, tickets_per_writer: int):
+    """
+    Simula a criação de chamados pelo chat (chamado + primeiro comentário, uma transação cada)
+    com 'writers' threads em paralelo. As tabelas já devem existir; os dados de teste são apagados no final.
+    Retorna (chamados gravados, erros, segundos).
+    """
+    with engine.begin() as connection:
+        user_id = connection.execute(User.__table__.insert().values(
+            email=f"bench-{time.time_ns()}@example.com", password_hash="-", first_name="Bench",
+            last_name="Writer", is_agent=False)).inserted_primary_key[0]
+
+    created = 0
+    errors = 0
+    lock = threading.Lock()
+
+    def write_tickets(writer):
+        nonlocal created, errors
+        for i in range(tickets_per_writer):
+            now = datetime.now(timezone.utc)
+            try:
+                with engine.begin() as connection:
+                    ticket_id = connection.execute(Ticket.__table__.insert().values(
+                        title=f"Chamado de teste {writer}-{i}", status='Aberto', priority='Média',
+                        ticket_type='Incidente', user_id=user_id, is_hidden=False,
+                        created_at=now, updated_at=now)).inserted_primary_key[0]
+                    connection.execute(TicketComment.__table__.insert().values(
+                        ticket_id=ticket_id, user_id=user_id, description="Texto do usuário " * 20,
+                        created_at=now, is_internal=False))
+                with lock:
+                    created += 1
+            except Exception:
+                with lock:
+                    errors += 1
+
+    threads = [threading.Thread(target=write_tickets, args=(writer,)) for writer in range(writers)]
+    started_at = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started_at
+
+    with engine.begin() as connection:
+        bench_tickets = db.select(Ticket.id).where(Ticket.user_id == user_id)
+        connection.execute(TicketComment.__table__.delete().where(TicketComment.ticket_id.in_(bench_tickets)))
+        connection.execute(Ticket.__table__.delete().where(Ticket.user_id == user_id))
+        connection.execute(User.__table__.delete().where(User.id == user_id))
+    return created, errors, elapsed
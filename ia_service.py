@@ -1,11 +1,22 @@
 import os
-import google.generativeai as genai
+import re
+import math
+import zlib
+import copy
+import hashlib
+import threading
+import time
 import json
+from cache_utils import TTLCache
+from text_utils import tokenize
+from ticket_classifier import TicketClassifier
+from llm_backends import (LLMError, GeminiBackend, HTTPBackend, ResilientBackend, CircuitBreaker)
 
 # --- BASE DE CONHECIMENTO ENRIQUECIDA ---
 # Agora com passos detalhados em HTML
 KNOWLEDGE_BASE = [
     {
+        "id": "energia",
         "keywords": ["nao liga", "não liga", "computador morto", "pc nao liga", "desktop nao liga", "notebook nao liga", "sem energia", "morreu", "não acende"],
         "solution_html": """
 <p>Um computador que não liga pode ser assustador, mas geralmente é algo simples na parte de energia. Vamos checar:</p>
@@ -20,6 +31,7 @@ KNOWLEDGE_BASE = [
         "follow_up": "Algum desses passos fez o equipamento dar algum sinal de vida (acender luzes, fazer barulho) ou ele continua totalmente 'morto'?"
     },
     {
+        "id": "internet",
         "keywords": ["internet", "wifi", "lenta", "sem conexão", "caiu", "rede", "navegar", "não conecta", "sem internet"],
         "solution_html": """
 <p>Problemas de conexão são comuns. Siga estes passos para tentar resolver:</p>
@@ -35,6 +47,7 @@ KNOWLEDGE_BASE = [
         "follow_up": "Após seguir esses passos, sua conexão voltou ao normal ou o problema persiste?"
     },
     {
+        "id": "impressora",
         "keywords": ["impressora", "imprimir", "não imprime", "erro impressão", "fila presa", "offline"],
         "solution_html": """
 <p>Impressora dando dor de cabeça? Vamos tentar o básico antes de chamar o suporte:</p>
@@ -55,6 +68,7 @@ KNOWLEDGE_BASE = [
         "follow_up": "Algum desses passos fez a impressora voltar a funcionar ou o problema continua?"
     },
      {
+        "id": "senha",
         "keywords": ["senha", "esqueci", "bloqueada", "resetar", "acesso", "expirou", "trocar senha"],
         "solution_html": """
 <p>Problemas com senha ou acesso bloqueado? Temos algumas opções:</p>
@@ -67,6 +81,7 @@ KNOWLEDGE_BASE = [
         "follow_up": "Conseguiu recuperar seu acesso com esses passos ou ainda está bloqueado?"
     },
     {
+        "id": "office",
         "keywords": ["excel lento", "word travando", "outlook nao abre", "outlook lento", "office lento", "programa travou", "excel travou", "powerpoint lento"],
         "solution_html": """
 <p>Programas do Office (Word, Excel, Outlook) estão lentos ou travando? Tente o seguinte:</p>
@@ -88,6 +103,7 @@ KNOWLEDGE_BASE = [
         "follow_up": "O programa voltou ao normal após esses passos, ou o problema continua?"
     },
     {
+        "id": "audio",
         "keywords": ["sem som", "audio nao funciona", "mudo", "caixa de som", "fone de ouvido", "nao sai som", "microfone", "não me ouvem"],
         "solution_html": """
 <p>Problemas com som ou microfone? Vamos verificar as configurações:</p>
@@ -102,6 +118,7 @@ KNOWLEDGE_BASE = [
         "follow_up": "O áudio ou microfone voltou a funcionar corretamente ou o problema persiste?"
     },
     {
+        "id": "vpn",
         "keywords": ["vpn", "nao conecta vpn", "sem acesso vpn", "conexao vpn", "cisco", "forticlient", "globalprotect"],
         "solution_html": """
 <p>Problemas para conectar na VPN da empresa? Tente estes passos:</p>
@@ -116,6 +133,7 @@ KNOWLEDGE_BASE = [
         "follow_up": "Conseguiu conectar na VPN ou continua com problemas de acesso?"
     },
     {
+        "id": "monitor",
         "keywords": ["monitor", "sem video", "tela preta", "segundo monitor", "nao detecta monitor", "resolucao", "tela piscando"],
         "solution_html": """
 <p>Problemas com o monitor ou segunda tela? Vamos checar as conexões e configurações:</p>
@@ -130,6 +148,7 @@ KNOWLEDGE_BASE = [
         "follow_up": "A imagem apareceu no monitor ou o problema persiste?"
     },
     {
+        "id": "computador-lento",
         "keywords": ["computador lento", "pc lento", "notebook lento", "demorando", "travando muito"],
         "solution_html": """
 <p>Computador lento pode ter várias causas, mas podemos tentar algumas otimizações básicas:</p>
@@ -144,6 +163,7 @@ KNOWLEDGE_BASE = [
         "follow_up": "O computador melhorou o desempenho após esses passos ou continua muito lento?"
     },
     {
+        "id": "mouse-teclado",
         "keywords": ["mouse", "teclado", "nao funciona", "sem fio", "parou", "nao digita", "cursor travado"],
         "solution_html": """
 <p>Mouse ou teclado parou de funcionar? Vamos checar o básico:</p>
@@ -170,91 +190,550 @@ KNOWLEDGE_BASE = [
 ]
 
 
-def get_chatbot_response(user_message: str, categories: list, force_ticket: bool = False) -> dict:
-    try:
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            return {"response": "Erro: API Key não configurada.", "action": "none"}
+# --- PRÉ-CLASSIFICADOR LOCAL DA KB ---
+# Responde problemas conhecidos sem chamar o Gemini quando a mensagem bate claramente
+# com as keywords de uma única entrada da KB.
+KB_MATCH_MIN_CONFIDENCE = float(os.getenv("KB_MATCH_MIN_CONFIDENCE", "0.8"))
+# Pontuação mínima (tokens casados): duas keywords ou uma expressão de várias palavras. Uma palavra
+# genérica sozinha ("caiu", "offline", "acesso") aparece em muitos problemas e fica com a IA.
+KB_MATCH_MIN_SCORE = int(os.getenv("KB_MATCH_MIN_SCORE", "2"))
+KB_MATCH_MAX_TOKENS = 40  # Mensagens longas costumam descrever problemas compostos
+
+# Sinais de problema complexo: nesses casos a decisão fica com a IA (ou com o chamado)
+COMPLEX_MARKERS = [
+    "fumaca", "queimou", "cheiro de queimado", "tela quebrada", "quebrou", "quebrado", "quebrada",
+    "tela azul", "nao inicializa", "virus", "phishing", "hacker", "invadido", "instalar",
+    "criar conta", "nova conta", "solicito", "solicitar", "preciso de um novo", "preciso de uma nova"
+]
+
+
+def _build_kb_index(knowledge_base: list) -> dict:
+    """Monta o índice invertido (token -> keywords) sobre as keywords da KB."""
+    phrases = []  # (índice da entrada, tokens da keyword)
+    seen = set()
+    for entry_idx, entry in enumerate(knowledge_base):
+        for keyword in entry["keywords"]:
+            phrase = tuple(tokenize(keyword))
+            if phrase and (entry_idx, phrase) not in seen:
+                seen.add((entry_idx, phrase))
+                phrases.append((entry_idx, phrase))
+
+    postings = {}
+    for phrase_id, (_, phrase) in enumerate(phrases):
+        for token in set(phrase):
+            postings.setdefault(token, []).append(phrase_id)
+
+    return {"phrases": phrases, "postings": postings}
+
+
+_KB_INDEX = _build_kb_index(KNOWLEDGE_BASE)
+_COMPLEX_MARKER_PHRASES = [" ".join(tokenize(marker)) for marker in COMPLEX_MARKERS]
+
+
+def match_knowledge_base(user_message: str):
+    """
+    Pontua a mensagem contra as keywords da KB.
+    Retorna o payload 'propose_solution' se houver uma entrada claramente vencedora, senão None.
+    """
+    tokens = tokenize(user_message)
+    if not tokens or len(tokens) > KB_MATCH_MAX_TOKENS:
+        return None
+
+    padded_message = f" {' '.join(tokens)} "
+    if any(f" {marker} " in padded_message for marker in _COMPLEX_MARKER_PHRASES):
+        return None
+
+    candidate_ids = set()
+    for token in set(tokens):
+        candidate_ids.update(_KB_INDEX["postings"].get(token, ()))
+
+    scores = {}
+    for phrase_id in candidate_ids:
+        entry_idx, phrase = _KB_INDEX["phrases"][phrase_id]
+        # A keyword só conta se aparecer inteira e na ordem (ex: "nao liga")
+        if f" {' '.join(phrase)} " in padded_message:
+            scores[entry_idx] = scores.get(entry_idx, 0) + len(phrase)
+
+    if not scores:
+        return None
+
+    best_idx = max(scores, key=scores.get)
+    if scores[best_idx] < KB_MATCH_MIN_SCORE:
+        return None
+    confidence = scores[best_idx] / sum(scores.values())
+    if confidence < KB_MATCH_MIN_CONFIDENCE:
+        return None
+
+    entry = KNOWLEDGE_BASE[best_idx]
+    return {
+        "action": "propose_solution",
+        "solution_html": entry["solution_html"],
+        "follow_up": entry["follow_up"]
+    }
+
+
+# --- RECUPERAÇÃO DOS CANDIDATOS DA KB ---
+# Em vez de mandar a KB inteira no prompt, ranqueamos as entradas por similaridade de cosseno
+# entre vetores esparsos de n-gramas de caracteres (com hashing) e enviamos só as top-k.
+KB_TOP_K = int(os.getenv("KB_TOP_K", "3"))
+_NGRAM_SIZES = (3, 4)
+_VECTOR_BUCKETS = 2 ** 18
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def _ngram_vector(text: str) -> dict:
+    """Vetor esparso normalizado (bucket -> peso) dos n-gramas de caracteres do texto."""
+    padded = f" {' '.join(tokenize(text))} "
+    counts = {}
+    for n in _NGRAM_SIZES:
+        for i in range(len(padded) - n + 1):
+            bucket = zlib.crc32(padded[i:i + n].encode('utf-8')) % _VECTOR_BUCKETS
+            counts[bucket] = counts.get(bucket, 0) + 1
+    norm = math.sqrt(sum(v * v for v in counts.values()))
+    return {bucket: v / norm for bucket, v in counts.items()} if norm else {}
+
+
+def _entry_vector(entry: dict) -> dict:
+    """Combina keywords (peso maior) e o texto da solução num único vetor normalizado."""
+    vector = {}
+    parts = [
+        (_ngram_vector(' . '.join(entry["keywords"])), 0.7),
+        (_ngram_vector(_HTML_TAG_RE.sub(' ', entry["solution_html"])), 0.3)
+    ]
+    for part, weight in parts:
+        for bucket, value in part.items():
+            vector[bucket] = vector.get(bucket, 0.0) + weight * value
+    norm = math.sqrt(sum(v * v for v in vector.values()))
+    return {bucket: v / norm for bucket, v in vector.items()} if norm else {}
+
+
+_KB_BY_ID = {entry["id"]: entry for entry in KNOWLEDGE_BASE}
+_KB_VECTORS = [(entry, _entry_vector(entry)) for entry in KNOWLEDGE_BASE]
+
+
+def rank_kb_entries(user_message: str) -> list:
+    """Lista (similaridade, entrada) de todas as entradas da KB, da mais parecida para a menos."""
+    query = _ngram_vector(user_message)
+    scored = []
+    for entry, vector in _KB_VECTORS:
+        # Itera sobre o menor vetor (a mensagem) para o produto escalar esparso
+        score = sum(weight * vector.get(bucket, 0.0) for bucket, weight in query.items())
+        scored.append((score, entry))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return scored
 
-        genai.configure(api_key=api_key)
-
-        kb_string = json.dumps(KNOWLEDGE_BASE)  # Converte a KB para string
-
-        # --- NOVO PROMPT MESTRE v4.2 ---
-        prompt = f"""
-        Você é um agente de Service Desk de TI Nível 1 (L1). Seu objetivo é resolver problemas comuns com a Base de Conhecimento (KB) ou criar um chamado estruturado se necessário.
-        A mensagem original do usuário é: "{user_message}"
-
-        **Flag de Forçar Chamado:** {force_ticket}
-        **Base de Conhecimento (KB) com Soluções Detalhadas:** {kb_string}
-        **Categorias ITSM Válidas:** {', '.join(categories)}
-
-        **Instruções de Processamento (SIGA ESTRITAMENTE):**
-
-        1.  **Analise a mensagem original:** "{user_message}".
-        2.  **Avalie a Complexidade:**
-            * **Problemas Complexos (Exigem Ticket Direto):** Se a mensagem indicar falha grave de hardware (ex: "PC soltando fumaça", "tela quebrada"), erro crítico de sistema (ex: "tela azul", "não inicializa"), alerta de segurança (ex: "vírus", "phishing"), ou for uma solicitação clara de serviço (ex: "instalar software", "criar conta"), **pule para o Passo 5 (Criar Chamado)**.
-            * **Problemas Simples (Tentar Resolver com KB):** Se for um problema comum de conectividade, acesso, impressão, ou uso básico de software, **continue para o Passo 3**.
-            * **Em caso de dúvida**, considere o problema como simples e tente a KB.
-
-        3.  **Verifique a Flag 'Forçar Chamado'.**
-            * **SE 'True'**: Ignore a KB e **vá direto para o Passo 5 (Criar Chamado)** usando a mensagem original.
-
-        4.  **Verifique a KB (SE 'Forçar Chamado' for 'False' E o problema for 'Simples'):**
-            * **SE a mensagem corresponder** a uma 'keyword' da KB:
-                * Responda com um JSON 'propose_solution' neste formato exato:
-                    {{
-                        "action": "propose_solution",
-                        "solution_html": "O texto HTML detalhado de 'solution_html' da KB",
-                        "follow_up": "O texto de 'follow_up' da KB"
-                    }}
-            * **SE NÃO corresponder à KB (mesmo sendo simples):**
-                * **Vá para o Passo 5 (Criar Chamado)**.
-
-        5.  **Crie um Chamado (SE Complexo OU Forçado OU Simples sem KB):**
-            * Baseado na mensagem original ("{user_message}"), gere um JSON 'create_ticket' neste formato exato:
-                {{
-                    "action": "create_ticket",
-                    "title": "Um título curto e claro para o problema '{user_message}'",
+
+def retrieve_kb_candidates(user_message: str, top_k: int = KB_TOP_K) -> list:
+    """Retorna as top-k entradas da KB mais parecidas com a mensagem (maior similaridade primeiro)."""
+    return [entry for score, entry in rank_kb_entries(user_message)[:top_k] if score > 0]
+
+
+# --- CLASSIFICADOR LOCAL DE CHAMADOS ---
+# Modelo treinado no histórico (flask train-classifier). Quando confiante, cria o chamado sem
+# chamar a IA; também é usado como plano B quando a API está fora do ar.
+CLASSIFIER_MIN_CONFIDENCE = float(os.getenv("CLASSIFIER_MIN_CONFIDENCE", "0.7"))
+KB_RELEVANCE_MIN = float(os.getenv("KB_RELEVANCE_MIN", "0.25"))  # Abaixo disso nenhuma entrada da KB se aplica
+_CLASSIFIER = None
+
+
+def load_classifier(path: str) -> bool:
+    """Carrega o modelo serializado do classificador local, se existir."""
+    global _CLASSIFIER
+    if not os.path.exists(path):
+        return False
+    _CLASSIFIER = TicketClassifier.load(path)
+    return True
+
+
+def _local_ticket_title(user_message: str) -> str:
+    first_sentence = re.split(r'(?<=[.!?])\s', user_message.strip(), maxsplit=1)[0]
+    title = ' '.join(first_sentence.split())
+    if len(title) > 80:
+        title = title[:77].rstrip() + '...'
+    return title[:1].upper() + title[1:]
+
+
+def classify_locally(user_message: str, categories: list, min_confidence: float = CLASSIFIER_MIN_CONFIDENCE):
+    """Payload 'create_ticket' previsto pelo classificador local, ou None se a confiança for baixa."""
+    if _CLASSIFIER is None:
+        return None
+
+    predictions = _CLASSIFIER.predict(user_message)
+    category = predictions["category"][0]
+    if category not in categories:
+        return None
+    if min(confidence for _, confidence in predictions.values()) < min_confidence:
+        return None
+
+    title = _local_ticket_title(user_message)
+    return {
+        "action": "create_ticket",
+        "title": title,
+        "ticket_type": predictions["ticket_type"][0],
+        "priority": predictions["priority"][0],
+        "category": category,
+        "response": f"Entendido. Abri o chamado #... para você sobre \"{title}\". A equipe responsável entrará em contato."
+    }
+
+
+# --- CACHE DE RESPOSTAS DA IA ---
+# Em incidentes recebemos centenas de mensagens quase iguais ("internet caiu") em minutos.
+# Guardamos as decisões da IA (propose_solution e create_ticket) por mensagem normalizada.
+# O placeholder do ID do chamado ('#...') é substituído por requisição em app.py, sobre uma cópia.
+RESPONSE_CACHE_MAX_SIZE = int(os.getenv("RESPONSE_CACHE_MAX_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "600"))
+_RESPONSE_CACHE = TTLCache(RESPONSE_CACHE_MAX_SIZE, RESPONSE_CACHE_TTL)
+
+
+def _response_cache_key(user_message: str, categories: list, force_ticket: bool) -> tuple:
+    categories_hash = hashlib.sha1('\n'.join(categories).encode('utf-8')).hexdigest()
+    return ' '.join(tokenize(user_message)), bool(force_ticket), categories_hash
+
+
+def get_response_cache_stats() -> dict:
+    """Tamanho e contadores de acerto/erro do cache de respostas."""
+    return _RESPONSE_CACHE.stats()
+
+
+# --- CLASSIFICAÇÃO PROVISÓRIA DO CHAMADO ---
+# Junto com a solução da KB a IA já devolve a classificação do chamado. Se o usuário responder
+# "Não, abra um chamado", o chamado é criado a partir dela, sem uma segunda chamada à IA
+# (guardada no banco pelo app.py: a resposta pode chegar em outro processo).
+TICKET_FIELDS = ("title", "ticket_type", "priority", "category", "response")
+
+
+# --- PROMPT MESTRE v5 ---
+# A parte estática (instruções e formatos) é montada uma única vez; cada requisição só anexa
+# a mensagem do usuário, a flag, as entradas candidatas da KB e as categorias.
+STATIC_PROMPT_PREFIX = """
+Você é um agente de Service Desk de TI Nível 1 (L1). Seu objetivo é resolver problemas comuns com a Base de Conhecimento (KB) ou criar um chamado estruturado se necessário.
+Os dados da requisição (mensagem original do usuário, flag de forçar chamado, entradas candidatas da KB e categorias válidas) estão no final deste prompt.
+
+**Instruções de Processamento (SIGA ESTRITAMENTE):**
+
+1.  **Analise a mensagem original do usuário.**
+2.  **Avalie a Complexidade:**
+    * **Problemas Complexos (Exigem Ticket Direto):** Se a mensagem indicar falha grave de hardware (ex: "PC soltando fumaça", "tela quebrada"), erro crítico de sistema (ex: "tela azul", "não inicializa"), alerta de segurança (ex: "vírus", "phishing"), ou for uma solicitação clara de serviço (ex: "instalar software", "criar conta"), **pule para o Passo 5 (Criar Chamado)**.
+    * **Problemas Simples (Tentar Resolver com KB):** Se for um problema comum de conectividade, acesso, impressão, ou uso básico de software, **continue para o Passo 3**.
+    * **Em caso de dúvida**, considere o problema como simples e tente a KB.
+
+3.  **Verifique a Flag 'Forçar Chamado'.**
+    * **SE 'True'**: Ignore a KB e **vá direto para o Passo 5 (Criar Chamado)** usando a mensagem original.
+
+4.  **Verifique a KB (SE 'Forçar Chamado' for 'False' E o problema for 'Simples'):**
+    * **SE a mensagem corresponder** a uma 'keyword' de uma das entradas candidatas da KB:
+        * Responda com um JSON 'propose_solution' neste formato exato:
+            {
+                "action": "propose_solution",
+                "kb_id": "O 'id' da entrada da KB correspondente",
+                "ticket": {
+                    "title": "Um título curto e claro para o problema da mensagem original",
                     "ticket_type": "Incidente ou Requisição",
-                    "priority": "Baixa, Média, Alta ou Urgente (estime pela descrição e complexidade)",
-                    "category": "A Categoria ITSM Válida MAIS APROPRIADA para '{user_message}'",
-                    "response": "A mensagem de confirmação para o usuário (ex: 'Entendido. Como este parece ser um problema mais complexo, abri o chamado #... para você sobre ... A equipe responsável entrará em contato.')"
-                }}
+                    "priority": "Baixa, Média, Alta ou Urgente",
+                    "category": "A Categoria ITSM Válida MAIS APROPRIADA",
+                    "response": "A mensagem de confirmação para o usuário, com o placeholder #... para o número do chamado"
+                }
+            }
+        * O campo 'ticket' é uma classificação provisória, usada caso a solução da KB não resolva.
+    * **SE NÃO corresponder à KB (mesmo sendo simples):**
+        * **Vá para o Passo 5 (Criar Chamado)**.
 
-        Gere APENAS o objeto JSON da sua decisão final (propose_solution ou create_ticket). NÃO inclua nenhuma outra explicação.
-        """
+5.  **Crie um Chamado (SE Complexo OU Forçado OU Simples sem KB):**
+    * Baseado na mensagem original, gere um JSON 'create_ticket' neste formato exato:
+        {
+            "action": "create_ticket",
+            "title": "Um título curto e claro para o problema da mensagem original",
+            "ticket_type": "Incidente ou Requisição",
+            "priority": "Baixa, Média, Alta ou Urgente (estime pela descrição e complexidade)",
+            "category": "A Categoria ITSM Válida MAIS APROPRIADA para a mensagem original",
+            "response": "A mensagem de confirmação para o usuário (ex: 'Entendido. Como este parece ser um problema mais complexo, abri o chamado #... para você sobre ... A equipe responsável entrará em contato.')"
+        }
 
-        model = genai.GenerativeModel('gemini-flash-latest')
-        response = model.generate_content(prompt)
+Gere APENAS o objeto JSON da sua decisão final (propose_solution ou create_ticket). NÃO inclua nenhuma outra explicação.
 
-        # Tenta interpretar a resposta da IA
+**Dados da Requisição:**
+"""
+
+class TokenBucket:
+    """Limita a taxa de chamadas à API: 'rate' por segundo, com rajadas de até 'capacity'."""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """Consome uma ficha se houver; senão, devolve quantos segundos faltam para a próxima."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Bloqueia até haver uma ficha disponível e a consome."""
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    def try_acquire(self) -> bool:
+        """Consome uma ficha só se houver uma disponível agora."""
+        return not self._take()
+
+
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-flash-latest")
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "20"))  # Segundos por chamada
+
+# Backend do modelo: "gemini" (padrão) ou "http" (servidor compatível, ex: 'flask llm-standin')
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_HTTP_URL = os.getenv("LLM_HTTP_URL", "http://127.0.0.1:8765/")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", str(GEMINI_TIMEOUT)))  # Prazo total, incluindo novas tentativas
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0"))  # Segundos até duplicar a chamada (0 desliga)
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+
+class ChatbotService:
+    """Serviço criado uma vez por processo: backend do modelo (com prazos e circuit breaker) e prompt estático."""
+
+    def __init__(self, backend, timeout: float = LLM_TIMEOUT):
+        self.backend = ResilientBackend(backend, timeout, max_retries=LLM_MAX_RETRIES, hedge_after=LLM_HEDGE_AFTER,
+                                        breaker=CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET))
+        self.timeout = timeout
+        self.prompt_prefix = STATIC_PROMPT_PREFIX
+
+    def build_prompt(self, user_message: str, categories: list, force_ticket: bool, candidates: list) -> str:
+        """Anexa as partes dinâmicas da requisição ao prefixo estático."""
+        kb_string = json.dumps([{"id": entry["id"], "keywords": entry["keywords"]} for entry in candidates],
+                               ensure_ascii=False)
+        return (f"{self.prompt_prefix}"
+                f"**Mensagem original do usuário:** {json.dumps(user_message, ensure_ascii=False)}\n"
+                f"**Flag de Forçar Chamado:** {force_ticket}\n"
+                f"**Base de Conhecimento (KB) - Entradas Candidatas:** {kb_string}\n"
+                f"**Categorias ITSM Válidas:** {', '.join(categories)}\n")
+
+    @property
+    def rate_limiter(self):
+        """TokenBucket opcional (ex: classificação em lote), aplicado a cada chamada real ao modelo."""
+        return self.backend.rate_limiter
+
+    @rate_limiter.setter
+    def rate_limiter(self, limiter):
+        self.backend.rate_limiter = limiter
+
+    def generate(self, prompt: str) -> str:
+        return self.backend.generate(prompt, self.timeout)
+
+    def generate_stream(self, prompt: str):
+        """Gera a resposta em modo streaming, devolvendo os pedaços de texto conforme chegam."""
+        yield from self.backend.generate_stream(prompt, self.timeout)
+
+    def warm_up(self):
+        self.backend.warm_up()
+
+
+_SERVICE = None
+_SERVICE_LOCK = threading.Lock()
+
+
+def create_backend():
+    """Backend configurado em LLM_BACKEND (None se faltar configuração, ex: GOOGLE_API_KEY)."""
+    if LLM_BACKEND == "http":
+        return HTTPBackend(LLM_HTTP_URL)
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        return None
+    return GeminiBackend(api_key, GEMINI_MODEL_NAME)
+
+
+def get_service():
+    """Retorna o ChatbotService do processo, criando-o na primeira chamada (None sem backend configurado)."""
+    global _SERVICE
+    if _SERVICE is None:
+        with _SERVICE_LOCK:
+            if _SERVICE is None:
+                backend = create_backend()
+                if backend is None:
+                    return None
+                _SERVICE = ChatbotService(backend)
+    return _SERVICE
+
+
+def warm_up_service():
+    """Cria o serviço e aquece a conexão com a API em segundo plano."""
+    def _warm_up():
         try:
-            # Remove possíveis blocos de código markdown que a IA às vezes adiciona
-            cleaned_response = response.text.strip().lstrip('```json').rstrip('```').strip()
-            action_data = json.loads(cleaned_response)
+            service = get_service()
+            if service:
+                service.warm_up()
+        except Exception as e:
+            print(f"Falha ao aquecer o serviço de IA: {e}")
+
+    threading.Thread(target=_warm_up, name="ia-warm-up", daemon=True).start()
+
+
+def get_fast_response(user_message: str, categories: list, force_ticket: bool = False):
+    """Resposta que não precisa da IA (KB local ou cache); None se for preciso chamar o modelo."""
+    if not force_ticket:
+        local_match = match_knowledge_base(user_message)
+        if local_match:
+            provisional_ticket = classify_locally(user_message, categories)
+            if provisional_ticket:
+                local_match["ticket"] = {field: provisional_ticket[field] for field in TICKET_FIELDS}
+            return local_match
+
+    cached_response = _RESPONSE_CACHE.get(_response_cache_key(user_message, categories, force_ticket))
+    if cached_response is not None:
+        return copy.deepcopy(cached_response)
 
-            # Validação básica do JSON retornado
-            if 'action' not in action_data or action_data['action'] not in ['propose_solution', 'create_ticket']:
-                raise ValueError("JSON da IA não contém 'action' válida.")
+    # Sem nenhuma entrada relevante da KB, a decisão é só classificar o chamado
+    if force_ticket or rank_kb_entries(user_message)[0][0] < KB_RELEVANCE_MIN:
+        return classify_locally(user_message, categories)
+    return None
 
+
+class DecisionStreamParser:
+    """
+    Lê o JSON da decisão da IA de forma incremental.
+    Assim que 'action' e 'kb_id' de um propose_solution chegam, a solução da KB já pode ser exibida,
+    antes de a IA terminar de gerar a classificação provisória do chamado.
+    """
+
+    _ACTION_RE = re.compile(r'"action"\s*:\s*"([a-z_]+)"')
+    _KB_ID_RE = re.compile(r'"kb_id"\s*:\s*"([^"\\]+)"')
+
+    def __init__(self):
+        self.text = ''
+        self.solution_sent = False
+
+    def feed(self, chunk: str):
+        """Acumula o pedaço recebido; retorna o payload parcial da solução na primeira vez que for possível."""
+        self.text += chunk
+        if self.solution_sent:
+            return None
+
+        action = self._ACTION_RE.search(self.text)
+        kb_id = self._KB_ID_RE.search(self.text)
+        if not action or action.group(1) != 'propose_solution' or not kb_id:
+            return None
+
+        entry = _KB_BY_ID.get(kb_id.group(1))
+        if entry is None:
+            return None
+        self.solution_sent = True
+        return {"action": "propose_solution", "solution_html": entry["solution_html"], "follow_up": entry["follow_up"]}
+
+
+def get_chatbot_response(user_message: str, categories: list, force_ticket: bool = False,
+                         on_partial=None) -> dict:
+    """Decide entre propor uma solução da KB ou criar um chamado (caminho rápido e, se preciso, a IA)."""
+    fast_response = get_fast_response(user_message, categories, force_ticket)
+    if fast_response is not None:
+        return fast_response
+    return get_model_response(user_message, categories, force_ticket, on_partial)
+
+
+def get_model_response(user_message: str, categories: list, force_ticket: bool = False,
+                       on_partial=None) -> dict:
+    """
+    Só a parte da IA de get_chatbot_response, para quem já consultou get_fast_response (o /chat).
+    Com 'on_partial', usa a geração em streaming e chama on_partial(payload) assim que a
+    solução da KB puder ser exibida, antes da resposta completa.
+    """
+    cache_key = _response_cache_key(user_message, categories, force_ticket)
+    try:
+        service = get_service()
+        if service is None:
+            return {"response": "Erro: API Key não configurada.", "action": "none"}
+
+        # Só as entradas candidatas (id + keywords) vão para o prompt; o HTML é preenchido localmente
+        candidates = [] if force_ticket else retrieve_kb_candidates(user_message)
+        prompt = service.build_prompt(user_message, categories, force_ticket, candidates)
+        if on_partial is None:
+            response_text = service.generate(prompt)
+        else:
+            parser = DecisionStreamParser()
+            for chunk in service.generate_stream(prompt):
+                partial = parser.feed(chunk)
+                if partial:
+                    on_partial(partial)
+            response_text = parser.text
+
+        # Tenta interpretar a resposta da IA
+        try:
+            action_data = parse_ai_decision(response_text)
+
+            # Só decisões válidas da IA entram no cache (o fallback genérico não)
+            _RESPONSE_CACHE.set(cache_key, copy.deepcopy(action_data))
             return action_data
 
         except (json.JSONDecodeError, TypeError, ValueError, Exception) as e:
-            print(f"Erro ao processar resposta da IA: {e}\nResposta Bruta: {response.text}")
+            print(f"Erro ao processar resposta da IA: {e}\nResposta Bruta: {response_text}")
             # Fallback: Se a IA falhar ou retornar algo inesperado, cria um chamado genérico
-            fallback_category = categories[0] if categories else "Geral"
-            return {
-                "action": "create_ticket",
-                "title": f"Problema reportado: {user_message[:50]}...",  # Título genérico
-                "ticket_type": "Incidente",
-                "priority": "Média",
-                "category": fallback_category,
-                "response": f"Entendi. Abri um chamado genérico (#{'{ticket_id}'}) para investigar seu problema: '{user_message[:50]}...'. A equipe entrará em contato."
-                # Placeholder para ID
-            }
+            return fallback_ticket(user_message, categories)
+
+    except LLMError as e:
+        # API fora do ar, lenta demais ou circuito aberto: vai direto para o chamado de fallback
+        print(f"Modelo indisponível, usando o chamado de fallback: {e}")
+        return fallback_ticket(user_message, categories)
 
     except Exception as e:
-        print(f"Ocorreu um erro GERAL na função get_chatbot_response: {e}")
+        print(f"Ocorreu um erro GERAL na função get_model_response: {e}")
+        # Com a API inacessível, o classificador local (se treinado) ainda abre o chamado
+        local_ticket = classify_locally(user_message, categories, min_confidence=0.0)
+        if local_ticket:
+            return local_ticket
         return {"response": "Desculpe, estou com um problema interno grave. Tente novamente mais tarde.",
-                "action": "error"}
\ No newline at end of file
+                "action": "error"}
+
+
+def parse_ai_decision(response_text: str) -> dict:
+    """Interpreta e valida o JSON devolvido pela IA, preenchendo a solução da KB localmente."""
+    # Remove possíveis blocos de código markdown que a IA às vezes adiciona
+    cleaned_response = response_text.strip().lstrip('```json').rstrip('```').strip()
+    action_data = json.loads(cleaned_response)
+
+    # Validação básica do JSON retornado
+    if 'action' not in action_data or action_data['action'] not in ['propose_solution', 'create_ticket']:
+        raise ValueError("JSON da IA não contém 'action' válida.")
+
+    if action_data['action'] == 'propose_solution':
+        entry = _KB_BY_ID.get(action_data.get('kb_id'))
+        if entry is None:
+            raise ValueError(f"JSON da IA aponta para uma entrada inexistente da KB: {action_data.get('kb_id')}")
+        provisional_ticket = action_data.get('ticket')
+        action_data = {
+            "action": "propose_solution",
+            "solution_html": entry["solution_html"],
+            "follow_up": entry["follow_up"]
+        }
+        if isinstance(provisional_ticket, dict) and all(provisional_ticket.get(field) for field in TICKET_FIELDS):
+            action_data["ticket"] = {field: provisional_ticket[field] for field in TICKET_FIELDS}
+
+    return action_data
+
+
+def fallback_ticket(user_message: str, categories: list) -> dict:
+    """Chamado genérico usado quando a resposta da IA não pode ser aproveitada."""
+    local_ticket = classify_locally(user_message, categories, min_confidence=0.0)
+    if local_ticket:
+        return local_ticket
+
+    fallback_category = categories[0] if categories else "Geral"
+    return {
+        "action": "create_ticket",
+        "title": f"Problema reportado: {user_message[:50]}...",  # Título genérico
+        "ticket_type": "Incidente",
+        "priority": "Média",
+        "category": fallback_category,
+        "response": f"Entendi. Abri um chamado genérico (#{'{ticket_id}'}) para investigar seu problema: '{user_message[:50]}...'. A equipe entrará em contato."
+        # Placeholder para ID
+    }
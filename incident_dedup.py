@@ -0,0 +1,113 @@
+import random
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from text_utils import tokenize
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+class NearDuplicateIndex:
+    """
+    Índice MinHash/LSH dos chamados abertos recentemente (título e primeiro comentário).
+    Detecta relatos quase idênticos (ex: dezenas de "internet caiu" num incidente de rede)
+    para que sejam ligados ao chamado pai em vez de virarem chamados novos.
+    Só guarda os chamados de uma janela deslizante de tempo, com limite de tamanho.
+    """
+
+    def __init__(self, window_seconds: float = 7200, max_items: int = 5000, threshold: float = 0.5,
+                 num_perm: int = 64, bands: int = 32, shingle_size: int = 4):
+        assert num_perm % bands == 0, "num_perm precisa ser múltiplo de bands"
+        self.window_seconds = window_seconds
+        self.max_items = max_items
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = random.Random(42)  # Permutações fixas: assinaturas estáveis entre reinícios
+        self._permutations = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                              for _ in range(num_perm)]
+        self._items = OrderedDict()  # ticket_id -> (timestamp, [assinaturas]), do mais antigo ao mais novo
+        self._buckets = {}  # (banda, hash da banda) -> {ticket_id}
+        self._lock = threading.Lock()
+
+    def _shingles(self, text: str) -> set:
+        normalized = ' '.join(tokenize(text))
+        if len(normalized) <= self.shingle_size:
+            return {zlib.crc32(normalized.encode('utf-8'))} if normalized else set()
+        return {zlib.crc32(normalized[i:i + self.shingle_size].encode('utf-8'))
+                for i in range(len(normalized) - self.shingle_size + 1)}
+
+    def signature(self, text: str):
+        """Assinatura MinHash do texto (None se o texto não tiver conteúdo)."""
+        shingles = self._shingles(text)
+        if not shingles:
+            return None
+        return tuple(min(((a * shingle + b) % _MERSENNE_PRIME) & _MAX_HASH for shingle in shingles)
+                     for a, b in self._permutations)
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, hash(signature[band * self.rows:(band + 1) * self.rows])
+
+    def add(self, ticket_id: int, texts: list, timestamp: float = None):
+        """Indexa um chamado (ex: [título, primeiro comentário]) no instante 'timestamp' (epoch)."""
+        signatures = [sig for sig in (self.signature(text) for text in texts) if sig]
+        if not signatures:
+            return
+        with self._lock:
+            self._remove(ticket_id)
+            self._items[ticket_id] = (timestamp or time.time(), signatures)
+            for signature in signatures:
+                for key in self._band_keys(signature):
+                    self._buckets.setdefault(key, set()).add(ticket_id)
+            self._expire()
+
+    def remove(self, ticket_id: int):
+        with self._lock:
+            self._remove(ticket_id)
+
+    def _remove(self, ticket_id: int):
+        item = self._items.pop(ticket_id, None)
+        if item is None:
+            return
+        for signature in item[1]:
+            for key in self._band_keys(signature):
+                bucket = self._buckets.get(key)
+                if bucket:
+                    bucket.discard(ticket_id)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def _expire(self):
+        oldest_allowed = time.time() - self.window_seconds
+        while self._items:
+            ticket_id, (timestamp, _) = next(iter(self._items.items()))
+            if timestamp >= oldest_allowed and len(self._items) <= self.max_items:
+                break
+            self._remove(ticket_id)
+
+    def find(self, text: str):
+        """Retorna (ticket_id, similaridade estimada) do chamado mais parecido acima do limiar, ou None."""
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        with self._lock:
+            self._expire()
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+
+            best = None
+            for ticket_id in candidates:
+                for candidate_signature in self._items[ticket_id][1]:
+                    similarity = sum(x == y for x, y in zip(signature, candidate_signature)) / len(signature)
+                    if similarity >= self.threshold and (best is None or similarity > best[1]):
+                        best = (ticket_id, similarity)
+            return best
+
+    def __len__(self):
+        return len(self._items)
@@ -0,0 +1,346 @@
+import json
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import google.generativeai as genai
+
+
+class LLMError(Exception):
+    """Falha ao obter resposta do modelo (erro, prazo esgotado ou circuito aberto)."""
+
+
+class CircuitOpenError(LLMError):
+    """O circuito está aberto: a API está instável e as chamadas são recusadas na hora."""
+
+
+class LLMBackend:
+    """Interface dos backends de modelo de linguagem."""
+
+    name = "base"
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        raise NotImplementedError
+
+    def generate_stream(self, prompt: str, timeout: float):
+        """Por padrão, entrega a resposta completa num único pedaço."""
+        yield self.generate(prompt, timeout)
+
+    def warm_up(self):
+        pass
+
+
+class GeminiBackend(LLMBackend):
+    """Backend do Google Gemini (google-generativeai)."""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str):
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        return self.model.generate_content(prompt, request_options={"timeout": timeout}).text
+
+    def generate_stream(self, prompt: str, timeout: float):
+        response = self.model.generate_content(prompt, stream=True, request_options={"timeout": timeout})
+        for chunk in response:
+            yield chunk.text
+
+    def warm_up(self):
+        """Abre o canal com a API antes do primeiro usuário (count_tokens não gera custo)."""
+        self.model.count_tokens("ping")
+
+
+class HTTPBackend(LLMBackend):
+    """Backend HTTP genérico: POST {"prompt": ...} e resposta {"text": ...} (ex: 'flask llm-standin')."""
+
+    name = "http"
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        request = urllib.request.Request(self.url, data=json.dumps({"prompt": prompt}).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read().decode("utf-8"))["text"]
+
+
+class CircuitBreaker:
+    """
+    Após 'failure_threshold' falhas seguidas o circuito abre e recusa chamadas por 'reset_timeout'
+    segundos; depois deixa passar uma chamada de teste (meio-aberto) antes de fechar de novo.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release(self):
+        """Encerra a chamada de teste sem resultado (quem chamou desistiu antes da resposta)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class ResilientBackend(LLMBackend):
+    """
+    Envolve outro backend com prazo por chamada, novas tentativas com jitter, requisições
+    "hedged" (uma segunda cópia se a primeira demorar) e circuit breaker.
+    As chamadas rodam num pool próprio: quem chama espera no máximo o prazo, mesmo com a API travada.
+    Com 'rate_limiter' (acquire/try_acquire), cada chamada real ao backend consome uma ficha.
+    """
+
+    def __init__(self, backend: LLMBackend, timeout: float, max_retries: int = 2, backoff_base: float = 0.25,
+                 hedge_after: float = 0, breaker: CircuitBreaker = None, max_workers: int = 32,
+                 rate_limiter=None):
+        self.backend = backend
+        self.name = backend.name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker()
+        self.rate_limiter = rate_limiter
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"llm-{backend.name}")
+
+    def _backoff(self, attempt: int, remaining: float):
+        # "Full jitter": espera aleatória entre 0 e base * 2^tentativa, sem passar do prazo
+        time.sleep(max(0.0, min(remaining, random.uniform(0, self.backoff_base * (2 ** attempt)))))
+
+    def _take_token(self, blocking: bool = True) -> bool:
+        # Tentativas, novas tentativas e cópias hedged contam igual: todas chegam à API
+        if self.rate_limiter is None:
+            return True
+        if blocking:
+            self.rate_limiter.acquire()
+            return True
+        return self.rate_limiter.try_acquire()
+
+    def _call_hedged(self, prompt: str, remaining: float) -> str:
+        waiting_since = time.monotonic()
+        self._take_token()
+        started_at = time.monotonic()
+        remaining -= started_at - waiting_since  # A espera pela ficha conta no prazo
+        if remaining <= 0:
+            raise LLMError("Prazo esgotado aguardando o limite de taxa")
+        futures = {self._executor.submit(self.backend.generate, prompt, remaining)}
+        if 0 < self.hedge_after < remaining:
+            done, _ = wait(futures, timeout=self.hedge_after)
+            # A cópia é só um atalho: sem ficha disponível na hora, espera a primeira chamada
+            if not done and self._take_token(blocking=False):
+                futures.add(self._executor.submit(self.backend.generate, prompt,
+                                                  remaining - self.hedge_after))
+
+        last_error = None
+        while futures:
+            left = remaining - (time.monotonic() - started_at)
+            done, futures = wait(futures, timeout=max(0.0, left), return_when=FIRST_COMPLETED)
+            if not done:
+                raise LLMError(f"Prazo de {remaining:.1f}s esgotado aguardando o modelo")
+            for future in done:
+                if future.exception() is None:
+                    return future.result()  # A primeira resposta válida vence
+                last_error = future.exception()
+        raise LLMError(f"Falha ao chamar o modelo: {last_error}") from last_error
+
+    def generate(self, prompt: str, timeout: float = None) -> str:
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Circuito aberto para o backend '{self.name}'")
+
+        deadline = time.monotonic() + (timeout or self.timeout)
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                text = self._call_hedged(prompt, remaining)
+                self.breaker.record_success()
+                return text
+            except LLMError as e:
+                last_error = e
+            if attempt < self.max_retries:
+                self._backoff(attempt, deadline - time.monotonic())
+
+        self.breaker.record_failure()
+        raise LLMError(f"Modelo indisponível após {self.max_retries + 1} tentativas: {last_error}")
+
+    def generate_stream(self, prompt: str, timeout: float = None):
+        """
+        Streaming com prazo total; só tenta de novo se a falha ocorrer antes do primeiro pedaço.
+        Se quem consome fechar o gerador (ex: cliente SSE desconectado), a leitura do backend para.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Circuito aberto para o backend '{self.name}'")
+
+        deadline = time.monotonic() + (timeout or self.timeout)
+        stop = threading.Event()
+        resolved = False  # O breaker já recebeu o resultado desta chamada
+        received_any = False
+        last_error = None
+        try:
+            for attempt in range(self.max_retries + 1):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                chunks = queue.Queue()
+
+                def pump():
+                    stream = self.backend.generate_stream(prompt, remaining)
+                    try:
+                        for chunk in stream:
+                            if stop.is_set():
+                                return
+                            chunks.put(("chunk", chunk))
+                        chunks.put(("end", None))
+                    except Exception as e:
+                        chunks.put(("error", e))
+                    finally:
+                        if hasattr(stream, "close"):
+                            stream.close()
+
+                self._take_token()
+                self._executor.submit(pump)
+                while True:
+                    try:
+                        kind, value = chunks.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        resolved = True
+                        self.breaker.record_failure()
+                        raise LLMError("Prazo esgotado durante o streaming do modelo")
+                    if kind == "chunk":
+                        received_any = True
+                        yield value
+                    elif kind == "end":
+                        resolved = True
+                        self.breaker.record_success()
+                        return
+                    else:
+                        last_error = value
+                        break
+
+                if received_any:
+                    break  # Não dá para repetir sem duplicar o que já foi entregue
+                if attempt < self.max_retries:
+                    self._backoff(attempt, deadline - time.monotonic())
+
+            resolved = True
+            self.breaker.record_failure()
+            raise LLMError(f"Falha no streaming do modelo: {last_error}")
+        finally:
+            stop.set()
+            if not resolved:
+                # Fechado no meio: se o modelo já respondia ele está de pé; senão, só libera a chamada
+                # de teste (com o circuito meio-aberto, ela ficaria presa e recusaria tudo dali em diante)
+                if received_any:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.release()
+
+    def warm_up(self):
+        self.backend.warm_up()
+
+
+# --- SERVIDOR LOCAL DE TESTE (STAND-IN) ---
+# Imita o modelo para testes de carga sem rede: lê os dados da requisição no final do prompt e
+# devolve uma decisão plausível no mesmo formato JSON, com latência e taxa de erro configuráveis.
+_MESSAGE_RE = re.compile(r'\*\*Mensagem original do usuário:\*\* (.*)')
+_FORCE_RE = re.compile(r'\*\*Flag de Forçar Chamado:\*\* (True|False)')
+_CANDIDATES_RE = re.compile(r'\*\*Base de Conhecimento \(KB\) - Entradas Candidatas:\*\* (.*)')
+_CATEGORIES_RE = re.compile(r'\*\*Categorias ITSM Válidas:\*\* (.*)')
+
+
+def standin_decision(prompt: str) -> dict:
+    """Decisão simulada a partir dos dados dinâmicos do prompt."""
+    def field(pattern, default):
+        match = pattern.search(prompt)
+        return match.group(1) if match else default
+
+    message = json.loads(field(_MESSAGE_RE, '""'))
+    candidates = json.loads(field(_CANDIDATES_RE, "[]"))
+    categories = [c.strip() for c in field(_CATEGORIES_RE, "Geral").split(",")]
+    title = message[:60] or "Problema reportado"
+    ticket = {
+        "title": title,
+        "ticket_type": "Incidente",
+        "priority": "Média",
+        "category": categories[0],
+        "response": f"Entendido. Abri o chamado #... para você sobre \"{title}\". A equipe responsável entrará em contato."
+    }
+    if field(_FORCE_RE, "False") == "False" and candidates:
+        return {"action": "propose_solution", "kb_id": candidates[0]["id"], "ticket": ticket}
+    return dict(ticket, action="create_ticket")
+
+
+def run_standin_server(host: str = "127.0.0.1", port: int = 8765, latency: float = 0.5, jitter: float = 0.2,
+                       error_rate: float = 0.0):
+    """Sobe o servidor HTTP de teste (bloqueia até Ctrl+C)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+            if random.random() < error_rate:
+                self.send_error(503, "Falha simulada")
+                return
+            prompt = json.loads(body.decode("utf-8")).get("prompt", "")
+            payload = json.dumps({"text": json.dumps(standin_decision(prompt), ensure_ascii=False)}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass  # Silencioso durante testes de carga
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"Servidor stand-in do modelo ouvindo em http://{host}:{port}/ (Ctrl+C para sair)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -5,6 +5,8 @@ from flask import current_app
 
 from alembic import context
 
+from search_service import SEARCH_TABLE
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -51,6 +53,15 @@ def get_metadata():
     return target_db.metadata
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    # A tabela virtual FTS5 da busca e as tabelas internas dela (search_index_data, _idx, _content,
+    # _docsize, _config) são criadas pelas migrações/search_service e não estão nos models: sem este
+    # filtro o autogenerate as trataria como removidas e geraria um DROP do índice de busca.
+    if type_ == 'table' and (name == SEARCH_TABLE or name.startswith(SEARCH_TABLE + '_')):
+        return False
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +76,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +105,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
@@ -0,0 +1,63 @@
+"""Busca textual (FTS5) em chamados e comentários
+
+Revision ID: c4f8e2a61b97
+Revises: 9e5a1c37d2b8
+Create Date: 2026-10-18 14:22:37.880142
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f8e2a61b97'
+down_revision = '9e5a1c37d2b8'
+branch_labels = None
+depends_on = None
+
+# O rowid identifica a origem: -ticket.id para o título e +comment.id para comentários
+UPGRADE_SQL = [
+    """CREATE VIRTUAL TABLE search_index USING fts5(
+        content, ticket_id UNINDEXED, is_internal UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER search_ticket_insert AFTER INSERT ON ticket BEGIN
+        INSERT INTO search_index (rowid, content, ticket_id, is_internal) VALUES (-new.id, new.title, new.id, 0);
+    END""",
+    """CREATE TRIGGER search_ticket_update AFTER UPDATE OF title ON ticket BEGIN
+        UPDATE search_index SET content = new.title WHERE rowid = -new.id;
+    END""",
+    """CREATE TRIGGER search_ticket_delete AFTER DELETE ON ticket BEGIN
+        DELETE FROM search_index WHERE rowid = -old.id;
+    END""",
+    """CREATE TRIGGER search_comment_insert AFTER INSERT ON ticket_comment BEGIN
+        INSERT INTO search_index (rowid, content, ticket_id, is_internal)
+        VALUES (new.id, new.description, new.ticket_id, new.is_internal);
+    END""",
+    """CREATE TRIGGER search_comment_update AFTER UPDATE OF description, is_internal ON ticket_comment BEGIN
+        UPDATE search_index SET content = new.description, is_internal = new.is_internal WHERE rowid = new.id;
+    END""",
+    """CREATE TRIGGER search_comment_delete AFTER DELETE ON ticket_comment BEGIN
+        DELETE FROM search_index WHERE rowid = old.id;
+    END""",
+    "INSERT INTO search_index (rowid, content, ticket_id, is_internal) SELECT -id, title, id, 0 FROM ticket",
+    """INSERT INTO search_index (rowid, content, ticket_id, is_internal)
+       SELECT id, description, ticket_id, is_internal FROM ticket_comment""",
+]
+
+
+def upgrade():
+    # FTS5 só existe no SQLite; em outros bancos a busca usa LIKE (search_service._search_like)
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in UPGRADE_SQL:
+        op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for trigger in ('search_ticket_insert', 'search_ticket_update', 'search_ticket_delete',
+                    'search_comment_insert', 'search_comment_update', 'search_comment_delete'):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS search_index")
@@ -0,0 +1,129 @@
+"""Status e prioridade dos chamados como SMALLINT, com índice parcial dos chamados em aberto
+
+Revision ID: e8c2f5a4b613
+Revises: d5a9b3e7f210
+Create Date: 2026-10-18 16:02:44.915237
+
+"""
+import unicodedata
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8c2f5a4b613'
+down_revision = 'd5a9b3e7f210'
+branch_labels = None
+depends_on = None
+
+# Cópia de models.TICKET_STATUSES / TICKET_PRIORITIES no momento desta migration (o código é a posição)
+STATUSES = ('Aberto', 'Em Andamento', 'Pendente', 'Resolvido', 'Fechado')
+PRIORITIES = ('Urgente', 'Alta', 'Média', 'Baixa')
+OPEN_PREDICATE = sa.text("status NOT IN (3, 4)")
+
+# No SQLite a batch_alter_table recria a tabela 'ticket', o que apaga os triggers da busca textual
+SEARCH_TICKET_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS search_ticket_insert AFTER INSERT ON ticket BEGIN
+        INSERT INTO search_index (rowid, content, ticket_id, is_internal) VALUES (-new.id, new.title, new.id, 0);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_ticket_update AFTER UPDATE OF title ON ticket BEGIN
+        UPDATE search_index SET content = new.title WHERE rowid = -new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_ticket_delete AFTER DELETE ON ticket BEGIN
+        DELETE FROM search_index WHERE rowid = -old.id;
+    END""",
+]
+
+
+def _normalize(text):
+    """Mesma normalização de models.normalize_priority: sem acentos, case-folding e sem espaços nas pontas."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold().strip()
+
+
+def _backfill_codes(column, target, labels, default):
+    """
+    Grava em 'target' o código de cada valor distinto de 'column'. A comparação é pelo texto normalizado:
+    a IA gravava "urgente", "ALTA", "media"... e um CASE com os rótulos exatos mandaria tudo para o padrão.
+    """
+    codes = {_normalize(label): code for code, label in enumerate(labels)}
+    ticket = sa.table('ticket', sa.column(column, sa.String), sa.column(target, sa.SmallInteger))
+    bind = op.get_bind()
+    for value, in bind.execute(sa.select(ticket.c[column]).distinct()).all():
+        bind.execute(ticket.update().where(ticket.c[column] == value)
+                     .values({target: codes.get(_normalize(value), default)}))
+
+
+def _code_to_label(column, labels):
+    cases = ' '.join(f"WHEN {code} THEN '{label}'" for code, label in enumerate(labels))
+    return f"CASE {column} {cases} END"
+
+
+def _recreate_search_triggers():
+    if op.get_bind().dialect.name == 'sqlite':
+        for statement in SEARCH_TICKET_TRIGGERS:
+            op.execute(statement)
+
+
+def upgrade():
+    with op.batch_alter_table('ticket', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status_code', sa.SmallInteger(), nullable=True))
+        batch_op.add_column(sa.Column('priority_code', sa.SmallInteger(), nullable=True))
+
+    # Status desconhecido vira 'Aberto' e prioridade desconhecida, 'Média' (mesmo padrão do modelo)
+    _backfill_codes('status', 'status_code', STATUSES, 0)
+    _backfill_codes('priority', 'priority_code', PRIORITIES, 2)
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('ticket', schema=None) as batch_op:
+        batch_op.drop_index('ix_ticket_responsible_priority_created')
+        batch_op.drop_index('ix_ticket_user_status_resolved')
+        batch_op.drop_column('status')
+        batch_op.drop_column('priority')
+        batch_op.drop_column('priority_rank')
+        batch_op.alter_column('status_code', new_column_name='status', existing_type=sa.SmallInteger(),
+                              nullable=False)
+        batch_op.alter_column('priority_code', new_column_name='priority', existing_type=sa.SmallInteger(),
+                              nullable=False)
+
+    with op.batch_alter_table('ticket', schema=None) as batch_op:
+        batch_op.create_index('ix_ticket_user_status_resolved', ['user_id', 'status', 'resolved_at'], unique=False)
+        batch_op.create_index('ix_ticket_open_queue', ['responsible_user_id', 'priority', 'created_at'], unique=False,
+                              sqlite_where=OPEN_PREDICATE, postgresql_where=OPEN_PREDICATE)
+
+    # ### end Alembic commands ###
+    _recreate_search_triggers()
+
+
+def downgrade():
+    with op.batch_alter_table('ticket', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status_label', sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column('priority_label', sa.String(length=50), nullable=True))
+
+    op.execute(f"""
+        UPDATE ticket SET status_label = {_code_to_label('status', STATUSES)},
+                          priority_label = {_code_to_label('priority', PRIORITIES)}
+    """)
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('ticket', schema=None) as batch_op:
+        batch_op.drop_index('ix_ticket_open_queue')
+        batch_op.drop_index('ix_ticket_user_status_resolved')
+        batch_op.drop_column('status')
+        batch_op.drop_column('priority')
+        batch_op.alter_column('status_label', new_column_name='status', existing_type=sa.String(length=50),
+                              nullable=False)
+        batch_op.alter_column('priority_label', new_column_name='priority', existing_type=sa.String(length=50),
+                              nullable=False)
+        batch_op.add_column(sa.Column('priority_rank', sa.SmallInteger(), nullable=False, server_default='2'))
+
+    op.execute("UPDATE ticket SET priority_rank = CASE priority "
+               "WHEN 'Urgente' THEN 0 WHEN 'Alta' THEN 1 WHEN 'Média' THEN 2 WHEN 'Baixa' THEN 3 ELSE 2 END")
+
+    with op.batch_alter_table('ticket', schema=None) as batch_op:
+        batch_op.create_index('ix_ticket_user_status_resolved', ['user_id', 'status', 'resolved_at'], unique=False)
+        batch_op.create_index('ix_ticket_responsible_priority_created',
+                              ['responsible_user_id', 'priority_rank', 'created_at'], unique=False)
+
+    # ### end Alembic commands ###
+    _recreate_search_triggers()
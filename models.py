@@ -1,10 +1,67 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import validates
 from flask_login import UserMixin
 from datetime import date, datetime, timezone
 from werkzeug.security import generate_password_hash, check_password_hash
+from text_utils import normalize_text
 
 db = SQLAlchemy()
 
+# Rótulos gravados como SMALLINT (a posição na tupla). Só acrescente valores no final: o código salvo é o índice.
+TICKET_STATUSES = ('Aberto', 'Em Andamento', 'Pendente', 'Resolvido', 'Fechado')
+CLOSED_STATUSES = ['Resolvido', 'Fechado']
+# Em ordem de atendimento: ORDER BY priority atende os urgentes primeiro
+TICKET_PRIORITIES = ('Urgente', 'Alta', 'Média', 'Baixa')
+DEFAULT_PRIORITY = 'Média'
+_PRIORITY_BY_TEXT = {normalize_text(priority): priority for priority in TICKET_PRIORITIES}
+
+
+class LabelEnum(db.TypeDecorator):
+    """Coluna SMALLINT que o Python lê e escreve como rótulo ('Aberto', 'Urgente', ...)."""
+
+    impl = db.SmallInteger
+    cache_ok = True
+
+    def __init__(self, labels):
+        super().__init__()
+        self.labels = tuple(labels)
+        self.codes = {label: code for code, label in enumerate(self.labels)}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if value not in self.codes:
+            raise ValueError(f"Valor inválido: {value!r} (esperado um de: {', '.join(self.labels)})")
+        return self.codes[value]
+
+    def process_literal_param(self, value, dialect):
+        return str(self.process_bind_param(value, dialect))
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else self.labels[value]
+
+    @property
+    def python_type(self):
+        return str
+
+
+def normalize_priority(priority) -> str:
+    """Prioridade vinda da IA ou do classificador ("urgente", "MEDIA") no rótulo oficial; desconhecida vira 'Média'."""
+    return _PRIORITY_BY_TEXT.get(normalize_text(priority or '').strip(), DEFAULT_PRIORITY)
+
+
+# Predicado dos índices parciais de chamados em aberto. As consultas precisam usar open_ticket_filter(),
+# que escreve os códigos no SQL: com parâmetros (?) o SQLite não reconhece o predicado e ignora o índice.
+OPEN_TICKET_PREDICATE = db.text(
+    f"status NOT IN ({', '.join(str(TICKET_STATUSES.index(status)) for status in CLOSED_STATUSES)})")
+
+
+def open_ticket_filter():
+    """Filtro "chamado em aberto" (status fora de CLOSED_STATUSES) que casa com os índices parciais."""
+    closed = db.bindparam('closed_statuses', CLOSED_STATUSES, type_=Ticket.status.type, expanding=True,
+                          literal_execute=True)
+    return Ticket.status.notin_(closed)
+
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -37,10 +94,21 @@ class Category(db.Model):
 
 
 class Ticket(db.Model):
+    # Índices compostos no formato (filtros de igualdade..., coluna de ordenação) de cada página
+    __table_args__ = (
+        db.Index('ix_ticket_user_hidden_updated', 'user_id', 'is_hidden', 'updated_at'),  # Hub e Meus Chamados
+        db.Index('ix_ticket_user_status_resolved', 'user_id', 'status', 'resolved_at'),  # Histórico e perfil
+        # Fila do agente e distribuição: só chamados em aberto (índice parcial, bem menor que a tabela)
+        db.Index('ix_ticket_open_queue', 'responsible_user_id', 'priority', 'created_at',
+                 sqlite_where=OPEN_TICKET_PREDICATE, postgresql_where=OPEN_TICKET_PREDICATE),
+        db.Index('ix_ticket_created', 'created_at'),  # Chamados recentes (detecção de duplicados)
+        db.Index('ix_ticket_parent', 'parent_id'),  # Chamados vinculados a um incidente principal
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
-    status = db.Column(db.String(50), nullable=False, default='Aberto')
-    priority = db.Column(db.String(50), nullable=False, default='Média')
+    status = db.Column(LabelEnum(TICKET_STATUSES), nullable=False, default='Aberto')
+    priority = db.Column(LabelEnum(TICKET_PRIORITIES), nullable=False, default=DEFAULT_PRIORITY)
     ticket_type = db.Column(db.String(50), nullable=False, default='Incidente')
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=True)
@@ -50,11 +118,22 @@ class Ticket(db.Model):
     updated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc),
                            onupdate=lambda: datetime.now(timezone.utc))
     resolved_at = db.Column(db.DateTime, nullable=True)
+    # Relato de outro usuário sobre um incidente já aberto: acompanha o status do chamado principal
+    # e fica fora da fila dos agentes (ver ticket_dispatch.sync_linked_tickets)
+    parent_id = db.Column(db.Integer, db.ForeignKey('ticket.id'), nullable=True)
     comments = db.relationship('TicketComment', backref='ticket', lazy=True, cascade="all, delete-orphan")
     attachments = db.relationship('Attachment', backref='ticket', lazy=True, cascade="all, delete-orphan")
 
+    @validates('priority')
+    def _normalize_priority(self, key, priority):
+        return normalize_priority(priority)
+
 
 class TicketComment(db.Model):
+    __table_args__ = (
+        db.Index('ix_ticket_comment_ticket_created', 'ticket_id', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     ticket_id = db.Column(db.Integer, db.ForeignKey('ticket.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -74,14 +153,71 @@ class KnowledgeBaseItem(db.Model):
 
 
 class Attachment(db.Model):
+    __table_args__ = (
+        db.Index('ix_attachment_ticket_uploaded', 'ticket_id', 'uploaded_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     ticket_id = db.Column(db.Integer, db.ForeignKey('ticket.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
-    # Nome do arquivo como salvo no servidor (ex: 8sd9f8sd9f.pdf)
+    # Caminho do arquivo dentro de UPLOAD_FOLDER (ex: blobs/ab/cd/abcd...; anexos antigos: 8sd9f8sd9f_print.png)
     storage_filename = db.Column(db.String(300), nullable=False)
 
+    # Conteúdo no armazenamento por hash (ver storage_service); None em anexos do formato antigo
+    blob_sha256 = db.Column(db.String(64), db.ForeignKey('attachment_blob.sha256'), nullable=True)
+
     # Nome original do arquivo (ex: "print_do_erro.png")
     original_filename = db.Column(db.String(300), nullable=False)
 
     uploaded_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+
+class AttachmentBlob(db.Model):
+    """Conteúdo de anexo guardado uma única vez, identificado pelo SHA-256; ref_count = anexos que o usam."""
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+
+class TicketCounter(db.Model):
+    """Contadores de chamados mantidos a cada mudança (evita COUNT(*) nas páginas)."""
+    # scope: 'user' (total, open, resolved), 'agent' (assigned_open) ou 'global' (unassigned_open, owner_id=0)
+    scope = db.Column(db.String(20), primary_key=True)
+    owner_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(30), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+
+class CacheVersion(db.Model):
+    """Versão de dados cacheados em memória; incrementada a cada mudança para invalidar os outros processos."""
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ChatJob(db.Model):
+    """Mensagem do chat processada em segundo plano. Fica no banco para qualquer processo responder a consulta."""
+    __table_args__ = (
+        db.Index('ix_chat_job_created', 'created_at'),  # Limpeza dos jobs vencidos
+    )
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending' ou 'done'
+    partial = db.Column(db.JSON, nullable=True)  # Solução da KB que já pode ser exibida
+    result = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+
+class ProvisionalTicket(db.Model):
+    """Classificação do chamado devolvida junto com a solução da KB, usada se o usuário pedir o chamado."""
+    __table_args__ = (
+        db.Index('ix_provisional_ticket_created', 'created_at'),  # Limpeza das vencidas
+    )
+
+    token = db.Column(db.String(32), primary_key=True)  # conversation_token enviado ao navegador
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    ticket = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
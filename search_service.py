@@ -0,0 +1,136 @@
+from markupsafe import Markup, escape
+from sqlalchemy import text
+from models import db, Ticket, TicketComment, TICKET_STATUSES
+from text_utils import tokenize
+
+# Índice FTS5 único para títulos de chamados e comentários. O rowid identifica a origem:
+# -ticket.id para o título e +comment.id para comentários. Triggers mantêm o índice em sincronia.
+SEARCH_TABLE = 'search_index'
+SEARCH_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        content, ticket_id UNINDEXED, is_internal UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_ticket_insert AFTER INSERT ON ticket BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, content, ticket_id, is_internal) VALUES (-new.id, new.title, new.id, 0);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_ticket_update AFTER UPDATE OF title ON ticket BEGIN
+        UPDATE {SEARCH_TABLE} SET content = new.title WHERE rowid = -new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_ticket_delete AFTER DELETE ON ticket BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = -old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_comment_insert AFTER INSERT ON ticket_comment BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, content, ticket_id, is_internal)
+        VALUES (new.id, new.description, new.ticket_id, new.is_internal);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_comment_update AFTER UPDATE OF description, is_internal ON ticket_comment
+    BEGIN
+        UPDATE {SEARCH_TABLE} SET content = new.description, is_internal = new.is_internal WHERE rowid = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_comment_delete AFTER DELETE ON ticket_comment BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+    END""",
+]
+
+# Marcadores do trecho destacado: caracteres de controle que não aparecem no texto do usuário
+_MARK_START, _MARK_END = '\x02', '\x03'
+
+
+def _fts_available() -> bool:
+    return db.engine.dialect.name == 'sqlite'
+
+
+def build_match_query(query: str):
+    """Converte o texto digitado numa expressão MATCH segura (termos entre aspas, prefixo no último)."""
+    terms = tokenize(query)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'  # Busca enquanto digita: "impres" encontra "impressora"
+    return ' '.join(quoted)
+
+
+def highlight(snippet: str) -> Markup:
+    """Escapa o trecho e só então troca os marcadores por <mark> (o texto do usuário nunca vira HTML)."""
+    return Markup(str(escape(snippet)).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+
+def ensure_search_index():
+    """Cria a tabela FTS5 e os triggers, se ainda não existirem (bancos criados sem migrations)."""
+    if not _fts_available():
+        return
+    for statement in SEARCH_DDL:
+        db.session.execute(text(statement))
+    db.session.commit()
+
+
+def reindex_search() -> int:
+    """Recria todo o conteúdo do índice a partir das tabelas de chamados e comentários."""
+    if not _fts_available():
+        return 0
+    ensure_search_index()
+    db.session.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    db.session.execute(text(f"""
+        INSERT INTO {SEARCH_TABLE} (rowid, content, ticket_id, is_internal)
+        SELECT -id, title, id, 0 FROM ticket
+    """))
+    db.session.execute(text(f"""
+        INSERT INTO {SEARCH_TABLE} (rowid, content, ticket_id, is_internal)
+        SELECT id, description, ticket_id, is_internal FROM ticket_comment
+    """))
+    db.session.execute(text(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')"))
+    db.session.commit()
+    return db.session.execute(text(f"SELECT count(*) FROM {SEARCH_TABLE}")).scalar()
+
+
+def search_tickets(query: str, user_id: int, is_agent: bool, page: int = 1, per_page: int = 20):
+    """
+    Busca em títulos e comentários, do mais relevante (bm25) ao menos relevante.
+    Usuários comuns só encontram os próprios chamados e nunca as notas internas.
+    Retorna (resultados, há mais páginas).
+    """
+    match = build_match_query(query)
+    if match is None:
+        return [], False
+    if not _fts_available():
+        return _search_like(query, user_id, is_agent, page, per_page)
+
+    permission = "" if is_agent else "AND t.user_id = :user_id AND s.is_internal = 0"
+    rows = db.session.execute(text(f"""
+        SELECT s.rowid, s.ticket_id, t.title, t.status,
+               snippet({SEARCH_TABLE}, 0, :mark_start, :mark_end, '…', 16) AS snippet
+        FROM {SEARCH_TABLE} AS s
+        JOIN ticket AS t ON t.id = s.ticket_id
+        WHERE {SEARCH_TABLE} MATCH :match {permission}
+        ORDER BY s.rank
+        LIMIT :limit OFFSET :offset
+    """), {'match': match, 'user_id': user_id, 'mark_start': _MARK_START, 'mark_end': _MARK_END,
+           'limit': per_page + 1, 'offset': (page - 1) * per_page}).all()
+
+    results = [{
+        'ticket_id': row.ticket_id,
+        'title': row.title,
+        'status': TICKET_STATUSES[row.status],  # SQL puro: a coluna vem com o código numérico
+        'source': 'title' if row.rowid < 0 else 'comment',
+        'snippet': highlight(row.snippet)
+    } for row in rows[:per_page]]
+    return results, len(rows) > per_page
+
+
+def _search_like(query: str, user_id: int, is_agent: bool, page: int, per_page: int):
+    """Busca simples por LIKE para bancos sem FTS5 (ex: PostgreSQL), sem ranking."""
+    pattern = f"%{query.strip()}%"
+    comments = TicketComment.query.join(Ticket).filter(TicketComment.description.ilike(pattern))
+    if not is_agent:
+        comments = comments.filter(Ticket.user_id == user_id, TicketComment.is_internal == False)
+    rows = comments.order_by(TicketComment.created_at.desc()) \
+        .offset((page - 1) * per_page).limit(per_page + 1).all()
+    results = [{
+        'ticket_id': comment.ticket_id,
+        'title': comment.ticket.title,
+        'status': comment.ticket.status,
+        'source': 'comment',
+        'snippet': escape(comment.description[:200])
+    } for comment in rows[:per_page]]
+    return results, len(rows) > per_page
@@ -0,0 +1,215 @@
+import hashlib
+import os
+import tempfile
+import time
+from flask import Request, current_app
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, Attachment, AttachmentBlob
+
+# Anexos ficam uma única vez em disco, no caminho derivado do SHA-256 do conteúdo
+# (uploads/blobs/ab/cd/abcd...). Cada Attachment aponta para o blob e AttachmentBlob.ref_count
+# conta quantos anexos usam o mesmo conteúdo; quando chega a zero o arquivo é apagado.
+BLOBS_DIR = 'blobs'
+TMP_DIR = 'tmp'
+CHUNK_SIZE = 64 * 1024
+# Arquivos derivados ficam ao lado do blob e saem junto com ele (ver thumbnail_service)
+THUMBNAIL_SUFFIX = '.thumb.jpg'
+PARTIAL_SUFFIX = '.tmp.jpg'
+
+
+def _upload_root() -> str:
+    return current_app.config['UPLOAD_FOLDER']
+
+
+def blob_relative_path(digest: str) -> str:
+    """Caminho do blob relativo a UPLOAD_FOLDER (é o que vai em Attachment.storage_filename)."""
+    return '/'.join((BLOBS_DIR, digest[:2], digest[2:4], digest))
+
+
+class HashingTempFile:
+    """
+    Arquivo temporário que calcula o SHA-256 enquanto é escrito. O parser de multipart do Werkzeug
+    grava o upload nele em pedaços, então o arquivo nunca fica inteiro em memória nem é copiado de novo.
+    """
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=directory, prefix='upload-')
+        self._file = os.fdopen(fd, 'w+b')
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self._hash.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)  # read, seek, tell, flush, fileno...
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def close(self):
+        self._file.close()
+        if self.path is not None:  # Não foi movido para o armazenamento: descarta
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+
+class UploadRequest(Request):
+    """Request que grava os arquivos enviados direto em HashingTempFile (ver app.request_class)."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingTempFile(os.path.join(_upload_root(), TMP_DIR))
+
+
+def _increment_blob(digest: str, size: int):
+    values = dict(sha256=digest, size=size, ref_count=1)
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        db.session.execute(insert(AttachmentBlob).values(**values).on_conflict_do_update(
+            index_elements=['sha256'], set_={'ref_count': AttachmentBlob.ref_count + 1}))
+        return
+
+    updated = AttachmentBlob.query.filter_by(sha256=digest) \
+        .update({AttachmentBlob.ref_count: AttachmentBlob.ref_count + 1}, synchronize_session=False)
+    if not updated:
+        db.session.add(AttachmentBlob(**values))
+
+
+def _copy_chunks(source, stream):
+    for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+        stream.write(chunk)
+
+
+def _place_blob(stream) -> str:
+    """Soma a referência ao blob do conteúdo de 'stream' e move o temporário para o caminho final."""
+    stream.flush()
+    os.fsync(stream.fileno())
+    digest = stream.hexdigest()
+
+    # A referência é gravada antes de o arquivo entrar no lugar: com a linha do blob travada por esta
+    # transação, a coleta de lixo não consegue apagar o mesmo arquivo entre um passo e outro.
+    _increment_blob(digest, stream.size)
+    final_path = os.path.join(_upload_root(), blob_relative_path(digest))
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    os.replace(stream.path, final_path)  # Se o conteúdo já existia, troca por um arquivo idêntico
+    stream.path = None
+    return digest
+
+
+def store_upload(file_storage) -> AttachmentBlob:
+    """
+    Guarda o conteúdo do upload no armazenamento por hash e soma uma referência ao blob, na transação
+    atual. Crie o Attachment com storage_filename=blob_relative_path(blob.sha256) e faça o commit.
+    """
+    stream = file_storage.stream
+    if isinstance(stream, HashingTempFile):
+        return db.session.get(AttachmentBlob, _place_blob(stream))
+
+    # Upload que não passou por UploadRequest (ex: testes): copia em pedaços calculando o hash
+    stream = HashingTempFile(os.path.join(_upload_root(), TMP_DIR))
+    try:
+        file_storage.stream.seek(0)
+        _copy_chunks(file_storage.stream, stream)
+        return db.session.get(AttachmentBlob, _place_blob(stream))
+    finally:
+        stream.close()
+
+
+def remove_attachment(attachment):
+    """Apaga o anexo e solta a referência ao blob (na transação atual; depois do commit, chame collect_blobs)."""
+    digest = attachment.blob_sha256
+    db.session.delete(attachment)
+    if digest is not None:
+        AttachmentBlob.query.filter_by(sha256=digest) \
+            .update({AttachmentBlob.ref_count: AttachmentBlob.ref_count - 1}, synchronize_session=False)
+    return digest
+
+
+def collect_blobs(digests=None) -> int:
+    """
+    Apaga os blobs sem referências (só os 'digests' informados, ou todos) e os arquivos deles.
+    Retorna quantos foram apagados.
+    """
+    if digests is None:
+        digests = [digest for digest, in db.session.query(AttachmentBlob.sha256).filter_by(ref_count=0)]
+
+    removed = 0
+    for digest in digests:
+        deleted = AttachmentBlob.query.filter_by(sha256=digest, ref_count=0).delete(synchronize_session=False)
+        if deleted:
+            # O arquivo sai enquanto a transação ainda segura a linha (ver store_upload)
+            blob_path = os.path.join(_upload_root(), blob_relative_path(digest))
+            for path in (blob_path, blob_path + THUMBNAIL_SUFFIX):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            removed += 1
+        db.session.commit()
+    return removed
+
+
+def sweep_storage(grace_seconds: float = 3600) -> dict:
+    """
+    Faxina completa: blobs sem referência, arquivos de blob sem registro no banco (upload que falhou
+    no commit) e temporários abandonados mais velhos que 'grace_seconds'.
+    """
+    stats = {'blobs': collect_blobs(), 'orphan_files': 0, 'temp_files': 0}
+    root = _upload_root()
+    cutoff = time.time() - grace_seconds
+
+    known = {digest for digest, in db.session.query(AttachmentBlob.sha256)}
+    for directory, _, filenames in os.walk(os.path.join(root, BLOBS_DIR)):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            orphan = filename.split('.', 1)[0] not in known or filename.endswith(PARTIAL_SUFFIX)
+            if orphan and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                stats['orphan_files'] += 1
+
+    tmp_dir = os.path.join(root, TMP_DIR)
+    if os.path.isdir(tmp_dir):
+        for filename in os.listdir(tmp_dir):
+            path = os.path.join(tmp_dir, filename)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                stats['temp_files'] += 1
+    return stats
+
+
+def import_legacy_attachments() -> int:
+    """Move os anexos do formato antigo (um arquivo por upload) para o armazenamento por hash."""
+    root = _upload_root()
+    moved = 0
+    for attachment in Attachment.query.filter(Attachment.blob_sha256.is_(None)).all():
+        legacy_path = os.path.join(root, attachment.storage_filename)
+        if not os.path.isfile(legacy_path):
+            print(f"Anexo #{attachment.id}: arquivo '{attachment.storage_filename}' não encontrado, mantido como está.")
+            continue
+
+        stream = HashingTempFile(os.path.join(root, TMP_DIR))
+        try:
+            with open(legacy_path, 'rb') as legacy_file:
+                _copy_chunks(legacy_file, stream)
+            digest = _place_blob(stream)
+        finally:
+            stream.close()
+
+        attachment.blob_sha256 = digest
+        attachment.storage_filename = blob_relative_path(digest)
+        db.session.commit()
+        os.remove(legacy_path)
+        if os.path.exists(legacy_path + THUMBNAIL_SUFFIX):
+            os.remove(legacy_path + THUMBNAIL_SUFFIX)  # 'flask generate-thumbnails' recria ao lado do blob
+        moved += 1
+    return moved
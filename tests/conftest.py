@@ -0,0 +1,96 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# O app lê DATABASE_URL ao ser importado: os testes usam um SQLite temporário, nunca o project.db
+_TMP_DIR = tempfile.mkdtemp(prefix='chamados-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_TMP_DIR, 'test.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_login import FlaskLoginClient  # noqa: E402
+from app import app as flask_app  # noqa: E402
+from models import db, User, Category, Ticket, TicketComment, Attachment  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    flask_app.config.update(TESTING=True, UPLOAD_FOLDER=str(tmp_path / 'uploads'))
+    flask_app.test_client_class = FlaskLoginClient
+    with flask_app.app_context():
+        db.create_all()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def engine(app):
+    with app.app_context():
+        return db.engine
+
+
+@pytest.fixture
+def users(app):
+    """Requisitante e agente (IDs, para não carregar objetos presos a uma sessão)."""
+    with app.app_context():
+        requester = User(email='usuario@teste.com', first_name='Ana', last_name='Souza')
+        agent = User(email='agente@teste.com', first_name='Bruno', last_name='Lima', is_agent=True)
+        for user in (requester, agent):
+            user.set_password('123456')
+        db.session.add_all([requester, agent, Category(name='Incidente - Hardware')])
+        db.session.commit()
+        return {'requester': requester.id, 'agent': agent.id}
+
+
+@pytest.fixture
+def make_tickets(app, users):
+    """
+    Cria 'count' chamados do requisitante, cada um com comentários e anexo. Categorias, responsáveis e
+    autores dos comentários são diferentes por chamado: com um só de cada, o identity map do SQLAlchemy
+    esconderia o N+1 (o lazy load acharia o objeto já carregado).
+    """
+    created = {'users': 0}
+
+    def new_user(is_agent=False):
+        created['users'] += 1
+        user = User(email=f'pessoa{created["users"]}@teste.com', first_name='Pessoa', last_name=str(created['users']),
+                    is_agent=is_agent, password_hash='-')
+        db.session.add(user)
+        db.session.flush()
+        return user.id
+
+    def make(count, comments=3):
+        with app.app_context():
+            tickets = []
+            for i in range(count):
+                category = Category(name=f'Categoria {len(tickets)}-{created["users"]}')
+                db.session.add(category)
+                db.session.flush()
+                # Um quarto dos chamados é do agente logado, metade é de outros agentes, o resto está sem responsável
+                responsible = [None, new_user(is_agent=True), users['agent'], new_user(is_agent=True)][i % 4]
+                ticket = Ticket(title=f'Chamado {i}', user_id=users['requester'], category_id=category.id,
+                                status='Aberto' if responsible is None else 'Em Andamento',
+                                responsible_user_id=responsible)
+                db.session.add(ticket)
+                db.session.flush()
+                for j in range(comments):
+                    author = new_user(is_agent=True) if j % 2 else users['requester']
+                    db.session.add(TicketComment(description=f'Comentário {j}', ticket_id=ticket.id, user_id=author))
+                db.session.add(Attachment(ticket_id=ticket.id, user_id=users['requester'],
+                                          storage_filename=f'legado_{i}.png', original_filename=f'print_{i}.png'))
+                tickets.append(ticket.id)
+            db.session.commit()
+            return tickets
+    return make
+
+
+@pytest.fixture
+def login(app):
+    def client_for(user_id):
+        with app.app_context():
+            user = db.session.get(User, user_id)
+            return app.test_client(user=user)
+    return client_for
@@ -0,0 +1,65 @@
+"""Chat: o "Não, abra um chamado" usa a classificação provisória guardada no banco, sem chamar a IA."""
+import pytest
+
+import app as app_module
+from models import db, ProvisionalTicket, Ticket
+
+MESSAGE = 'minha impressora não imprime'
+PROVISIONAL = {
+    'title': 'Impressora não imprime', 'ticket_type': 'Incidente', 'priority': 'Alta',
+    'category': 'Incidente - Hardware', 'response': 'Entendido. Abri o chamado #... para você.'
+}
+
+
+@pytest.fixture
+def no_model(monkeypatch):
+    """Falha o teste se o chat tentar classificar a mensagem de novo."""
+    def unexpected(*args, **kwargs):
+        raise AssertionError('a mensagem não deveria ser classificada de novo')
+    monkeypatch.setattr(app_module, 'get_fast_response', unexpected)
+    monkeypatch.setattr(app_module, 'get_model_response', unexpected)
+
+
+def store(app, user_id, message=MESSAGE):
+    with app.app_context():
+        return app_module.store_provisional_ticket(user_id, message, PROVISIONAL)
+
+
+def ask_for_ticket(client, token, message=MESSAGE):
+    return client.post('/chat', json={'message': message, 'force_ticket': True, 'conversation_token': token})
+
+
+def test_follow_up_creates_the_ticket_from_the_stored_classification(app, users, login, no_model):
+    token = store(app, users['requester'])
+    # Outro processo (ou um reinício) só enxerga o banco
+    response = ask_for_ticket(login(users['requester']), token)
+
+    data = response.get_json()
+    assert data['action'] == 'ticket_created'
+    assert data['response'] == f"Entendido. Abri o chamado #{data['ticket_id']} para você."
+    with app.app_context():
+        ticket = db.session.get(Ticket, data['ticket_id'])
+        assert (ticket.title, ticket.priority, ticket.user_id) == ('Impressora não imprime', 'Alta', users['requester'])
+        assert ProvisionalTicket.query.count() == 0
+
+
+def test_token_is_used_only_once_and_only_by_its_owner(app, users, login):
+    token = store(app, users['requester'])
+    with app.app_context():
+        assert app_module.take_provisional_ticket(token, users['agent'], MESSAGE) is None
+        assert app_module.take_provisional_ticket(token, users['requester'], MESSAGE)['action'] == 'create_ticket'
+        assert app_module.take_provisional_ticket(token, users['requester'], MESSAGE) is None
+
+
+def test_expired_or_different_message_is_not_used(app, users):
+    token = store(app, users['requester'])
+    with app.app_context():
+        assert app_module.take_provisional_ticket(token, users['requester'], 'outra mensagem') is None
+
+    token = store(app, users['requester'])
+    app.config['PROVISIONAL_TICKET_TTL'] = -1
+    try:
+        with app.app_context():
+            assert app_module.take_provisional_ticket(token, users['requester'], MESSAGE) is None
+    finally:
+        app.config['PROVISIONAL_TICKET_TTL'] = 900
@@ -0,0 +1,77 @@
+"""Chat em segundo plano: o job fica no banco, roda só a parte da IA e o resultado é consultado por polling."""
+import threading
+import time
+
+import pytest
+
+import app as app_module
+from incident_dedup import NearDuplicateIndex
+from models import db, ChatJob, Ticket
+
+MESSAGE = 'o sistema de folha de pagamento não gera o holerite'
+
+
+@pytest.fixture
+def model(monkeypatch):
+    """Caminho rápido sem resposta e IA falsa, que só responde quando o teste liberar."""
+    calls = {'fast': 0, 'model': 0}
+    release = threading.Event()
+
+    def fast_response(message, categories, force_ticket):
+        calls['fast'] += 1
+        return None
+
+    def model_response(message, categories, force_ticket, on_partial=None):
+        calls['model'] += 1
+        release.wait(5)
+        return {'action': 'create_ticket', 'title': 'Holerite não é gerado', 'ticket_type': 'Incidente',
+                'priority': 'Alta', 'category': 'Incidente - Hardware',
+                'response': 'Entendido. Abri o chamado #... para você.'}
+
+    monkeypatch.setattr(app_module, 'get_fast_response', fast_response)
+    monkeypatch.setattr(app_module, 'get_model_response', model_response)
+    monkeypatch.setattr(app_module, 'incident_index', NearDuplicateIndex())
+    monkeypatch.setattr(app_module, 'incident_index_high_water', 0)
+    calls['release'] = release
+    return calls
+
+
+def wait_for_result(client, status_url):
+    for _ in range(100):
+        data = client.get(status_url).get_json()
+        if data['action'] != 'pending':
+            return data
+        time.sleep(0.05)
+    raise AssertionError('o job do chat não terminou')
+
+
+def test_job_is_stored_and_polled_until_the_ticket_is_created(app, users, login, model):
+    client = login(users['requester'])
+    response = client.post('/chat', json={'message': MESSAGE})
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job['action'] == 'pending' and 'stream_url' not in job  # SSE só com CHAT_STREAMING=1
+
+    # Enquanto a IA responde, o estado está no banco (qualquer worker consegue responder a consulta)
+    with app.app_context():
+        assert db.session.get(ChatJob, job['job_id']).status == 'pending'
+    assert client.get(job['status_url']).get_json()['action'] == 'pending'
+
+    model['release'].set()
+    data = wait_for_result(client, job['status_url'])
+    assert data['action'] == 'ticket_created'
+    assert data['response'] == f"Entendido. Abri o chamado #{data['ticket_id']} para você."
+    assert data['ticket_url'].endswith(f"/ticket/{data['ticket_id']}")
+    with app.app_context():
+        assert db.session.get(Ticket, data['ticket_id']).priority == 'Alta'
+
+    # O caminho rápido roda uma vez, no /chat; o job só chama a IA
+    assert (model['fast'], model['model']) == (1, 1)
+
+
+def test_job_is_visible_only_to_its_owner(users, login, model):
+    model['release'].set()
+    job = login(users['requester']).post('/chat', json={'message': MESSAGE}).get_json()
+    wait_for_result(login(users['requester']), job['status_url'])
+
+    assert login(users['agent']).get(job['status_url']).status_code == 404
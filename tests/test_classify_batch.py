@@ -0,0 +1,71 @@
+"""flask classify-batch: uma linha ruim ou uma mensagem que falha não derruba o lote, e a retomada pula o que já foi feito."""
+import json
+
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def classified(monkeypatch):
+    """Classificação falsa (sem IA) que falha para a mensagem 'explode'."""
+    calls = []
+
+    def fake_response(message, categories, force_ticket):
+        calls.append(message)
+        if message == 'explode':
+            raise RuntimeError('resposta inesperada do modelo')
+        return {'action': 'create_ticket', 'title': message}
+
+    monkeypatch.setattr(app_module, 'get_chatbot_response', fake_response)
+    monkeypatch.setattr(app_module, 'get_service', lambda: None)
+    return calls
+
+
+def run_batch(app, input_path, output_path):
+    result = app.test_cli_runner().invoke(args=['classify-batch', str(input_path), str(output_path)])
+    assert result.exit_code == 0, result.output
+    with open(output_path, encoding='utf-8') as f:
+        return {record['id']: record for record in map(json.loads, f)}
+
+
+def test_bad_lines_and_failures_become_error_records(app, tmp_path, classified):
+    input_path = tmp_path / 'entrada.jsonl'
+    input_path.write_text('\n'.join([
+        json.dumps({'id': 'a', 'message': 'impressora sem toner'}),
+        '{"id": "b", "message": ',  # JSON quebrado
+        json.dumps(['não', 'é', 'objeto']),
+        json.dumps({'id': 'c', 'message': 'explode'}),
+        json.dumps({'id': 'd'}),
+        json.dumps({'id': 'e', 'title': 'VPN', 'body': 'não conecta'}),
+    ]) + '\n', encoding='utf-8')
+
+    records = run_batch(app, input_path, tmp_path / 'saida.jsonl')
+    assert set(records) == {'a', 'linha-2', 'linha-3', 'c', 'd', 'e'}
+    assert records['a']['action'] == records['e']['action'] == 'create_ticket'
+    for record_id in ('linha-2', 'linha-3', 'c', 'd'):
+        assert records[record_id]['action'] == 'error'
+    assert 'resposta inesperada' in records['c']['response']
+
+
+def test_resume_skips_done_ids_and_garbage_in_the_output(app, tmp_path, classified):
+    input_path = tmp_path / 'entrada.jsonl'
+    input_path.write_text(''.join(json.dumps({'id': str(i), 'message': f'mensagem {i}'}) + '\n'
+                                  for i in range(4)), encoding='utf-8')
+    output_path = tmp_path / 'saida.jsonl'
+    # Saída de uma execução interrompida: um resultado, uma linha que não é objeto e uma linha truncada
+    output_path.write_text(json.dumps({'id': '0', 'action': 'create_ticket'}) + '\n' + '[1, 2]\n' + '{"id": "1", "ac',
+                           encoding='utf-8')
+
+    result = app.test_cli_runner().invoke(args=['classify-batch', str(input_path), str(output_path)])
+    assert result.exit_code == 0, result.output
+    assert sorted(classified) == ['mensagem 1', 'mensagem 2', 'mensagem 3']
+
+    ids = []
+    with open(output_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                ids.append(json.loads(line)['id'])
+            except (ValueError, TypeError):
+                continue
+    assert sorted(ids) == ['0', '1', '2', '3']
@@ -0,0 +1,93 @@
+"""Distribuição de chamados: ordem da fila, disputa entre agentes, chamados vinculados e contadores."""
+from datetime import datetime, timedelta
+
+from models import db, Ticket, TicketCounter, User
+from ticket_counters import rebuild_counters
+from ticket_dispatch import claim_tickets
+
+
+def counter_values():
+    return {(row.scope, row.owner_id, row.name): row.value for row in TicketCounter.query if row.value}
+
+
+def add_ticket(user_id, priority='Média', minutes_ago=0, **fields):
+    ticket = Ticket(title='Sem rede', user_id=user_id, priority=priority,
+                    created_at=datetime(2024, 5, 1, 12, 0) - timedelta(minutes=minutes_ago), **fields)
+    db.session.add(ticket)
+    db.session.flush()
+    return ticket.id
+
+
+def test_claims_by_priority_then_oldest(app, users):
+    with app.app_context():
+        low = add_ticket(users['requester'], 'Baixa', minutes_ago=90)
+        urgent_new = add_ticket(users['requester'], 'Urgente', minutes_ago=5)
+        urgent_old = add_ticket(users['requester'], 'Urgente', minutes_ago=60)
+        high = add_ticket(users['requester'], 'Alta', minutes_ago=120)
+        db.session.commit()
+
+        # A ordem do RETURNING não é garantida: a ordem da fila é conferida um chamado por vez
+        for expected in (urgent_old, urgent_new, high, low):
+            assert claim_tickets(users['agent']) == [expected]
+            db.session.commit()
+        assert claim_tickets(users['agent']) == []
+
+
+def test_limit_claims_the_first_tickets_of_the_queue(app, users):
+    with app.app_context():
+        low = add_ticket(users['requester'], 'Baixa', minutes_ago=90)
+        first = [add_ticket(users['requester'], 'Urgente'), add_ticket(users['requester'], 'Alta')]
+        db.session.commit()
+
+        assert sorted(claim_tickets(users['agent'], limit=2)) == sorted(first)
+        db.session.commit()
+        assert claim_tickets(users['agent'], limit=2) == [low]
+
+
+def test_ticket_already_taken_is_not_claimed_again(app, users):
+    with app.app_context():
+        other_agent = User(email='outro@teste.com', first_name='Carla', last_name='Dias', is_agent=True,
+                           password_hash='-')
+        db.session.add(other_agent)
+        ticket_id = add_ticket(users['requester'])
+        db.session.commit()
+
+        assert claim_tickets(users['agent'], ticket_id=ticket_id) == [ticket_id]
+        db.session.commit()
+        assert claim_tickets(other_agent.id, ticket_id=ticket_id) == []
+
+        ticket = db.session.get(Ticket, ticket_id)
+        assert (ticket.responsible_user_id, ticket.status) == (users['agent'], 'Em Andamento')
+
+
+def test_closed_and_linked_tickets_stay_out_of_the_queue(app, users):
+    with app.app_context():
+        parent = add_ticket(users['requester'], minutes_ago=30)
+        add_ticket(users['requester'], status='Resolvido', minutes_ago=60)
+        child = add_ticket(users['requester'], minutes_ago=90, parent_id=parent)
+        db.session.commit()
+
+        assert claim_tickets(users['agent'], limit=5) == [parent]
+        db.session.commit()
+
+        # O vinculado acompanha o principal sem ter sido assumido na fila
+        linked = db.session.get(Ticket, child)
+        assert (linked.responsible_user_id, linked.status) == (users['agent'], 'Em Andamento')
+
+
+def test_counters_match_a_full_rebuild_after_claims(app, users):
+    with app.app_context():
+        parent = add_ticket(users['requester'], 'Urgente')
+        add_ticket(users['requester'], parent_id=parent)
+        for minutes_ago in range(3):
+            add_ticket(users['requester'], minutes_ago=minutes_ago)
+        db.session.commit()
+        rebuild_counters()
+
+        claim_tickets(users['agent'], limit=2)
+        db.session.commit()
+        incremental = counter_values()
+        rebuild_counters()
+        assert incremental == counter_values()
+        assert incremental[('agent', users['agent'], 'assigned_open')] == 2
+        assert incremental[('global', 0, 'unassigned_open')] == 2
@@ -0,0 +1,37 @@
+"""Caminho rápido do assistente: quando a KB local responde sem chamar a IA."""
+import pytest
+
+from ia_service import KNOWLEDGE_BASE, match_knowledge_base
+
+
+def matched_entry(message):
+    result = match_knowledge_base(message)
+    if result is None:
+        return None
+    return next(entry["id"] for entry in KNOWLEDGE_BASE if entry["solution_html"] == result["solution_html"])
+
+
+@pytest.mark.parametrize('message, entry_id', [
+    ('minha impressora não imprime', 'impressora'),
+    ('estou sem internet desde cedo', 'internet'),
+    ('esqueci minha senha', 'senha'),
+    ('meu pc nao liga', 'energia'),
+    ('o mouse parou', 'mouse-teclado'),
+])
+def test_clear_matches_are_answered_locally(message, entry_id):
+    assert matched_entry(message) == entry_id
+
+
+@pytest.mark.parametrize('message', [
+    'o sistema de vendas parou',
+    'o SAP está offline',
+    'o servidor caiu',
+    'preciso de acesso ao sistema financeiro',
+    'meu celular morreu',
+])
+def test_a_single_generic_word_goes_to_the_model(message):
+    assert match_knowledge_base(message) is None
+
+
+def test_complex_problems_go_to_the_model():
+    assert match_knowledge_base('o pc nao liga e saiu fumaca') is None
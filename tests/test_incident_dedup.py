@@ -0,0 +1,113 @@
+"""Relatos duplicados de incidentes: índice MinHash/LSH, vínculo ao chamado principal e status sincronizado."""
+import pytest
+
+import app as app_module
+from incident_dedup import NearDuplicateIndex
+from models import db, Ticket, TicketComment, User
+
+REPORT = 'A internet caiu no prédio todo, ninguém consegue acessar os sistemas'
+
+
+def test_index_finds_near_identical_reports_only():
+    index = NearDuplicateIndex()
+    index.add(1, ['Internet fora do ar', REPORT])
+    index.add(2, ['Impressora do financeiro', 'A impressora do financeiro não imprime desde ontem'])
+
+    ticket_id, similarity = index.find('a internet caiu no predio todo, ninguem consegue acessar o sistema')
+    assert ticket_id == 1 and similarity >= index.threshold
+    assert index.find('preciso instalar o photoshop no meu notebook') is None
+
+
+def test_index_forgets_reports_outside_the_window():
+    index = NearDuplicateIndex(window_seconds=60)
+    index.add(1, [REPORT], timestamp=1)
+    assert index.find(REPORT) is None
+    assert len(index) == 0
+
+
+@pytest.fixture
+def incident_index(monkeypatch):
+    """Índice novo por teste: o banco é recriado e os IDs voltam a 1."""
+    monkeypatch.setattr(app_module, 'incident_index', NearDuplicateIndex())
+    monkeypatch.setattr(app_module, 'incident_index_high_water', 0)
+    # Sem KB nem IA: a mensagem vai direto para a detecção de duplicados
+    monkeypatch.setattr(app_module, 'get_fast_response', lambda *args: None)
+
+
+@pytest.fixture
+def parent_ticket(app, users, incident_index):
+    """Chamado aberto por outro worker depois que este processo já tinha carregado o índice."""
+    def open_ticket(title, description):
+        ticket = Ticket(title=title, user_id=users['requester'])
+        db.session.add(ticket)
+        db.session.flush()
+        db.session.add(TicketComment(description=description, ticket_id=ticket.id, user_id=users['requester']))
+        db.session.commit()
+        return ticket.id
+
+    with app.app_context():
+        open_ticket('Impressora do financeiro', 'A impressora do financeiro não imprime desde ontem')
+        assert len(app_module.get_incident_index()) == 1
+        return open_ticket('Internet fora do ar', REPORT)
+
+
+@pytest.fixture
+def colleague(app):
+    with app.app_context():
+        user = User(email='colega@teste.com', first_name='Davi', last_name='Reis', password_hash='-')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def report(client):
+    return client.post('/chat', json={'message': REPORT}).get_json()
+
+
+def test_same_requester_gets_a_comment_on_the_open_ticket(app, users, login, parent_ticket):
+    data = report(login(users['requester']))
+    assert (data['action'], data['ticket_id']) == ('linked_to_ticket', parent_ticket)
+    with app.app_context():
+        assert TicketComment.query.filter_by(ticket_id=parent_ticket).count() == 2
+        assert Ticket.query.filter(Ticket.id > parent_ticket).count() == 0
+
+
+def test_other_user_gets_a_linked_ticket_kept_out_of_the_queue(app, login, parent_ticket, colleague):
+    data = report(login(colleague))
+    assert data['action'] == 'ticket_created'
+    assert data['parent_ticket_id'] == parent_ticket
+
+    with app.app_context():
+        child = db.session.get(Ticket, data['ticket_id'])
+        assert (child.user_id, child.parent_id) == (colleague, parent_ticket)
+        note = TicketComment.query.filter_by(ticket_id=parent_ticket, is_internal=True).one()
+        assert f"#{child.id}" in note.description
+        assert child.id not in [ticket.id for ticket in app_module.agent_queue_query(None)]
+
+    # O próprio chamado vinculado nunca vira o "principal" de outro relato
+    assert report(login(colleague))['parent_ticket_id'] == parent_ticket
+
+
+def linked_status(app, ticket_id):
+    with app.app_context():
+        child = Ticket.query.filter_by(parent_id=ticket_id).one()
+        return child.status, child.responsible_user_id, child.resolved_at is not None
+
+
+def test_linked_ticket_follows_the_parent_status(app, users, login, parent_ticket, colleague):
+    report(login(colleague))
+    agent, requester = login(users['agent']), login(users['requester'])
+
+    agent.post(f'/agent/ticket/assign/{parent_ticket}')
+    assert linked_status(app, parent_ticket) == ('Em Andamento', users['agent'], False)
+
+    agent.post(f'/agent/ticket/status/{parent_ticket}', data={'new_status': 'Resolvido'})
+    assert linked_status(app, parent_ticket) == ('Resolvido', users['agent'], True)
+
+    # O requisitante do principal reabre: o vinculado volta a ficar em andamento
+    requester.post(f'/user/ticket/review/{parent_ticket}', data={'new_status': 'Em Andamento'})
+    assert linked_status(app, parent_ticket) == ('Em Andamento', users['agent'], False)
+
+    agent.post(f'/agent/ticket/status/{parent_ticket}', data={'new_status': 'Resolvido'})
+    requester.post(f'/user/ticket/review/{parent_ticket}', data={'new_status': 'Fechado'})
+    assert linked_status(app, parent_ticket) == ('Fechado', users['agent'], True)
@@ -0,0 +1,161 @@
+"""Circuit breaker e ResilientBackend (novas tentativas, prazo total) com um backend falso, sem rede."""
+import threading
+import time
+
+import pytest
+
+from llm_backends import CircuitBreaker, CircuitOpenError, LLMBackend, LLMError, ResilientBackend
+
+
+class FakeBackend(LLMBackend):
+    """Falha nas 'failures' primeiras chamadas e depois responde 'ok' (após 'delay' segundos)."""
+
+    name = "fake"
+
+    def __init__(self, failures=0, delay=0.0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, timeout):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        time.sleep(self.delay)
+        if call <= self.failures:
+            raise LLMError(f"falha {call}")
+        return "ok"
+
+
+def resilient(backend, **options):
+    options.setdefault('breaker', CircuitBreaker(failure_threshold=100, reset_timeout=60))
+    return ResilientBackend(backend, timeout=options.pop('timeout', 5), backoff_base=0, **options)
+
+
+def test_breaker_opens_after_consecutive_failures_and_half_opens_after_reset():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.05)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    assert breaker.allow()  # Uma única chamada de teste passa...
+    assert not breaker.allow()  # ...as outras esperam o resultado dela
+
+
+def test_breaker_trial_failure_reopens_and_success_closes():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_retries_until_the_backend_answers():
+    backend = FakeBackend(failures=2)
+    assert resilient(backend, max_retries=2).generate("prompt") == "ok"
+    assert backend.calls == 3
+
+
+def test_gives_up_after_max_retries_and_records_one_breaker_failure():
+    backend = FakeBackend(failures=10)
+    breaker = CircuitBreaker(failure_threshold=100, reset_timeout=60)
+    with pytest.raises(LLMError):
+        resilient(backend, max_retries=2, breaker=breaker).generate("prompt")
+    assert backend.calls == 3
+    assert breaker.failures == 1
+
+
+def test_open_circuit_fails_fast_without_calling_the_backend():
+    backend = FakeBackend()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        resilient(backend, breaker=breaker).generate("prompt")
+    assert backend.calls == 0
+
+
+def test_total_deadline_covers_a_hung_backend():
+    backend = FakeBackend(delay=2)
+    started_at = time.monotonic()
+    with pytest.raises(LLMError):
+        resilient(backend, max_retries=3, timeout=0.2).generate("prompt")
+    assert time.monotonic() - started_at < 1
+
+
+def test_hedged_copy_answers_when_the_first_call_is_slow():
+    class SlowFirstCall(FakeBackend):
+        def generate(self, prompt, timeout):
+            with self._lock:
+                self.calls += 1
+                call = self.calls
+            time.sleep(1 if call == 1 else 0)
+            return f"resposta {call}"
+
+    backend = SlowFirstCall()
+    started_at = time.monotonic()
+    assert resilient(backend, hedge_after=0.05).generate("prompt") == "resposta 2"
+    assert time.monotonic() - started_at < 0.5
+
+
+class EndlessStream(LLMBackend):
+    """Stream que nunca termina sozinho; conta quantos pedaços o backend chegou a produzir."""
+
+    name = "endless"
+
+    def __init__(self):
+        self.produced = 0
+
+    def generate_stream(self, prompt, timeout):
+        while True:
+            self.produced += 1
+            yield f"pedaço {self.produced} "
+            time.sleep(0.01)
+
+
+def test_closing_the_stream_during_the_half_open_trial_resolves_it():
+    backend = EndlessStream()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    stream = resilient(backend, breaker=breaker).generate_stream("prompt")
+    assert next(stream).startswith("pedaço")
+    stream.close()  # Ex: o cliente SSE desconectou
+
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_closing_the_stream_stops_reading_from_the_backend():
+    backend = EndlessStream()
+    stream = resilient(backend).generate_stream("prompt")
+    next(stream)
+    stream.close()
+
+    time.sleep(0.05)
+    produced = backend.produced
+    time.sleep(0.1)
+    assert backend.produced <= produced + 1
@@ -0,0 +1,46 @@
+"""Status e prioridade gravados como SMALLINT (LabelEnum) e a normalização das prioridades."""
+import pytest
+from sqlalchemy.exc import StatementError
+
+from models import db, normalize_priority, open_ticket_filter, Ticket, TICKET_PRIORITIES, TICKET_STATUSES
+
+
+def test_labels_are_stored_as_their_position(app, users):
+    with app.app_context():
+        ticket = Ticket(title='Impressora', user_id=users['requester'], status='Pendente', priority='Urgente')
+        db.session.add(ticket)
+        db.session.commit()
+
+        raw = db.session.execute(db.text('SELECT status, priority FROM ticket WHERE id = :id'),
+                                 {'id': ticket.id}).one()
+        assert tuple(raw) == (TICKET_STATUSES.index('Pendente'), TICKET_PRIORITIES.index('Urgente'))
+
+        db.session.expire_all()
+        ticket = db.session.get(Ticket, ticket.id)
+        assert (ticket.status, ticket.priority) == ('Pendente', 'Urgente')
+
+
+def test_unknown_status_is_rejected(app, users):
+    with app.app_context():
+        db.session.add(Ticket(title='Impressora', user_id=users['requester'], status='Concluído'))
+        with pytest.raises(StatementError, match='Valor inválido'):
+            db.session.commit()
+        db.session.rollback()
+
+
+@pytest.mark.parametrize('raw, expected', [
+    ('urgente', 'Urgente'), ('MEDIA', 'Média'), (' alta ', 'Alta'), ('Crítica', 'Média'), (None, 'Média'),
+])
+def test_priority_is_normalized(raw, expected):
+    assert normalize_priority(raw) == expected
+
+
+def test_filters_and_ordering_use_the_labels(app, users):
+    with app.app_context():
+        for status, priority in [('Aberto', 'Baixa'), ('Resolvido', 'Urgente'), ('Em Andamento', 'Alta')]:
+            db.session.add(Ticket(title=status, user_id=users['requester'], status=status, priority=priority))
+        db.session.commit()
+
+        open_titles = [ticket.title for ticket in Ticket.query.filter(open_ticket_filter()).order_by(Ticket.priority)]
+        assert open_titles == ['Em Andamento', 'Aberto']
+        assert Ticket.query.filter_by(status='Resolvido').one().priority == 'Urgente'
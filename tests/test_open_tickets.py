@@ -0,0 +1,39 @@
+"""Trecho da lista de abertos do Hub: ETag por versão e por formato, 304 sem reenviar a lista."""
+from models import db, Ticket
+
+
+def test_unchanged_list_answers_304(login, users, make_tickets):
+    make_tickets(2, comments=1)
+    client = login(users['requester'])
+    first = client.get('/tickets/open')
+    assert first.status_code == 200 and first.headers['ETag']
+    assert 'private' in first.headers['Cache-Control'] and 'no-cache' in first.headers['Cache-Control']
+
+    again = client.get('/tickets/open', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304 and again.data == b''
+
+
+def test_html_and_json_have_different_etags(login, users, make_tickets):
+    make_tickets(2, comments=1)
+    client = login(users['requester'])
+    html = client.get('/tickets/open')
+    json = client.get('/tickets/open?format=json')
+    assert html.headers['ETag'] != json.headers['ETag']
+
+    # O ETag do HTML guardado pelo navegador não pode responder 304 para o JSON
+    response = client.get('/tickets/open?format=json', headers={'If-None-Match': html.headers['ETag']})
+    assert response.status_code == 200
+    assert len(response.get_json()['tickets']) == 2
+
+
+def test_new_ticket_changes_the_etag(app, login, users, make_tickets):
+    make_tickets(1, comments=1)
+    client = login(users['requester'])
+    etag = client.get('/tickets/open').headers['ETag']
+
+    with app.app_context():
+        db.session.add(Ticket(title='Outro problema', user_id=users['requester']))
+        db.session.commit()
+    response = client.get('/tickets/open', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert b'Outro problema' in response.data
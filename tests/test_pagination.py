@@ -0,0 +1,53 @@
+"""Paginação por cursor (keyset): percorre tudo sem repetir nem pular, inclusive com datas empatadas."""
+from datetime import datetime
+
+from app import paginate_tickets
+from models import db, Ticket
+
+
+def walk(query, sort_columns, descending, page_size):
+    pages, cursor = [], None
+    while True:
+        tickets, cursor = paginate_tickets(query, sort_columns, descending, cursor=cursor, page_size=page_size)
+        pages.append([ticket.id for ticket in tickets])
+        if cursor is None:
+            return pages
+
+
+def test_pages_cover_every_ticket_once_even_with_tied_dates(app, make_tickets):
+    ids = make_tickets(7, comments=0)
+    with app.app_context():
+        # Todos com a mesma data: a ordem (e o cursor) desempata pelo id
+        Ticket.query.update({Ticket.updated_at: datetime(2024, 5, 1, 12, 0)})
+        db.session.commit()
+
+        query = Ticket.query.order_by(Ticket.updated_at.desc(), Ticket.id.desc())
+        pages = walk(query, (Ticket.updated_at,), descending=True, page_size=3)
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert sum(pages, []) == sorted(ids, reverse=True)
+
+
+def test_ascending_pages_by_priority(app, make_tickets):
+    ids = make_tickets(5, comments=0)
+    with app.app_context():
+        for ticket_id, priority in zip(ids, ['Baixa', 'Urgente', 'Média', 'Urgente', 'Alta']):
+            db.session.get(Ticket, ticket_id).priority = priority
+        db.session.commit()
+
+        query = Ticket.query.order_by(Ticket.priority.asc(), Ticket.id.asc())
+        pages = walk(query, (Ticket.priority,), descending=False, page_size=2)
+    assert sum(pages, []) == [ids[1], ids[3], ids[4], ids[2], ids[0]]
+
+
+def test_exact_last_page_has_no_next_cursor(app, make_tickets):
+    make_tickets(4, comments=0)
+    with app.app_context():
+        query = Ticket.query.order_by(Ticket.updated_at.desc(), Ticket.id.desc())
+        _, cursor = paginate_tickets(query, (Ticket.updated_at,), True, page_size=4)
+    assert cursor is None
+
+
+def test_invalid_cursor_is_a_bad_request(login, users):
+    client = login(users['requester'])
+    for cursor in ('lixo', 'bWFpcw', 'MjAyNC0wMS0wMQ'):  # 'lixo', 'mais' e uma data sem id
+        assert client.get(f'/my_tickets?cursor={cursor}').status_code == 400
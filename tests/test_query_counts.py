@@ -0,0 +1,38 @@
+"""Páginas principais com número fixo de consultas SQL: um N+1 (consulta por chamado ou comentário) falha aqui."""
+import pytest
+
+from db_utils import assert_max_queries
+
+MAX_QUERIES = 8  # Mesmo limite padrão de 'flask check-query-counts'
+
+
+def count_queries(engine, client, url):
+    client.get(url)  # Aquece caches de processo (usuário logado, categorias) como num servidor já no ar
+    with assert_max_queries(engine, MAX_QUERIES) as counter:
+        response = client.get(url)
+    assert response.status_code == 200
+    return counter.count
+
+
+@pytest.mark.parametrize('role, url', [
+    ('requester', '/'),
+    ('requester', '/my_tickets'),
+    ('agent', '/agent/queue'),
+])
+def test_list_pages_do_not_grow_with_tickets(engine, users, make_tickets, login, role, url):
+    client = login(users[role])
+    make_tickets(3)
+    few = count_queries(engine, client, url)
+    make_tickets(20)
+    many = count_queries(engine, client, url)
+    assert many == few, f"{url}: {few} consultas com 3 chamados, {many} com 23"
+
+
+@pytest.mark.parametrize('role', ['requester', 'agent'])
+def test_ticket_page_does_not_grow_with_comments(engine, users, make_tickets, login, role):
+    client = login(users[role])
+    few_comments, = make_tickets(1, comments=2)
+    many_comments, = make_tickets(1, comments=30)
+    few = count_queries(engine, client, f'/ticket/{few_comments}')
+    many = count_queries(engine, client, f'/ticket/{many_comments}')
+    assert many == few, f"detalhe do chamado: {few} consultas com 2 comentários, {many} com 30"
@@ -0,0 +1,97 @@
+"""Busca FTS5 em títulos e comentários: relevância, permissões e a tabela fora do autogenerate."""
+import os
+
+import flask_migrate
+import pytest
+from sqlalchemy import inspect, text
+
+from models import db, Ticket, TicketComment, User
+from search_service import SEARCH_TABLE, ensure_search_index, highlight, search_tickets
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def search_index(app):
+    """A tabela FTS5 fica fora dos models: o drop_all do fixture 'app' não a remove."""
+    with app.app_context():
+        ensure_search_index()
+    yield
+    with app.app_context():
+        db.session.execute(text(f'DROP TABLE IF EXISTS {SEARCH_TABLE}'))
+        db.session.commit()
+
+
+@pytest.fixture
+def tickets(app, users, search_index):
+    with app.app_context():
+        other = User(email='outro@teste.com', first_name='Eva', last_name='Melo', password_hash='-')
+        db.session.add(other)
+        db.session.flush()
+        printer = Ticket(title='Impressora do prédio B', user_id=users['requester'])
+        network = Ticket(title='Rede lenta', user_id=other.id)
+        db.session.add_all([printer, network])
+        db.session.flush()
+        db.session.add_all([
+            TicketComment(description='A impressora mostra erro de papel atolado', ticket_id=printer.id,
+                          user_id=users['requester']),
+            TicketComment(description='Trocar o fusor da impressora', ticket_id=printer.id,
+                          user_id=users['agent'], is_internal=True),
+            TicketComment(description='A impressora do 2º andar também falha', ticket_id=network.id,
+                          user_id=other.id),
+        ])
+        db.session.commit()
+        return {'printer': printer.id, 'network': network.id}
+
+
+def sources(results):
+    return sorted((result['ticket_id'], result['source']) for result in results)
+
+
+def test_prefix_and_accent_insensitive_search(app, users, tickets):
+    with app.app_context():
+        results, has_more = search_tickets('predio', users['requester'], is_agent=False)
+        assert sources(results) == [(tickets['printer'], 'title')]
+        assert str(results[0]['snippet']) == 'Impressora do <mark>prédio</mark> B'
+
+        results, _ = search_tickets('papel atol', users['requester'], is_agent=False)
+        assert sources(results) == [(tickets['printer'], 'comment')]
+        assert not has_more
+
+
+def test_users_see_only_their_tickets_and_never_internal_notes(app, users, tickets):
+    with app.app_context():
+        requester_results, _ = search_tickets('impressora', users['requester'], is_agent=False)
+        agent_results, _ = search_tickets('impressora', users['agent'], is_agent=True)
+    assert sources(requester_results) == [(tickets['printer'], 'comment'), (tickets['printer'], 'title')]
+    assert len(agent_results) == 4  # Inclui a nota interna e o chamado do outro usuário
+
+
+def test_highlight_escapes_user_text():
+    assert str(highlight('<b>\x02erro\x03</b>')) == '&lt;b&gt;<mark>erro</mark>&lt;/b&gt;'
+
+
+@pytest.fixture
+def migrated_db(monkeypatch):
+    """Banco de testes criado pelas migrations (com a tabela FTS5), não pelo create_all."""
+    from app import app as flask_app
+    monkeypatch.chdir(REPO_ROOT)
+    with flask_app.app_context():
+        db.drop_all()
+        flask_migrate.upgrade()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+        db.drop_all()
+        for table in (SEARCH_TABLE, 'alembic_version'):
+            db.session.execute(text(f'DROP TABLE IF EXISTS {table}'))
+        db.session.commit()
+
+
+def test_autogenerate_ignores_the_search_index(migrated_db):
+    with migrated_db.app_context():
+        assert SEARCH_TABLE in inspect(db.engine).get_table_names()
+        try:
+            flask_migrate.check()  # Sai com erro se o autogenerate encontrar diferenças
+        except SystemExit as exit:
+            pytest.fail(f'flask db check encontrou diferenças no schema ({exit.code})')
@@ -0,0 +1,85 @@
+"""Armazenamento por hash: conteúdo repetido guardado uma vez, contagem de referências e coleta de lixo."""
+import hashlib
+import io
+import os
+
+from werkzeug.datastructures import FileStorage
+
+from models import db, Attachment, AttachmentBlob, Ticket
+from storage_service import blob_relative_path, collect_blobs, remove_attachment, store_upload, sweep_storage
+
+CONTENT = b'print da tela de erro' * 1000
+DIGEST = hashlib.sha256(CONTENT).hexdigest()
+
+
+def attach(ticket_id, user_id, content=CONTENT, filename='print.png'):
+    blob = store_upload(FileStorage(stream=io.BytesIO(content), filename=filename))
+    attachment = Attachment(ticket_id=ticket_id, user_id=user_id, storage_filename=blob_relative_path(blob.sha256),
+                            blob_sha256=blob.sha256, original_filename=filename)
+    db.session.add(attachment)
+    db.session.commit()
+    return attachment
+
+
+def blob_path(app, digest=DIGEST):
+    return os.path.join(app.config['UPLOAD_FOLDER'], blob_relative_path(digest))
+
+
+def ref_count(digest=DIGEST):
+    db.session.expire_all()
+    blob = db.session.get(AttachmentBlob, digest)
+    return None if blob is None else blob.ref_count
+
+
+def test_same_content_is_stored_once(app, users):
+    with app.app_context():
+        ticket = Ticket(title='Erro', user_id=users['requester'])
+        db.session.add(ticket)
+        db.session.commit()
+        first = attach(ticket.id, users['requester'])
+        second = attach(ticket.id, users['requester'], filename='de_novo.png')
+
+        assert first.storage_filename == second.storage_filename
+        assert ref_count() == 2
+        with open(blob_path(app), 'rb') as stored:
+            assert stored.read() == CONTENT
+        assert db.session.get(AttachmentBlob, DIGEST).size == len(CONTENT)
+
+
+def test_file_is_removed_only_with_the_last_reference(app, users):
+    with app.app_context():
+        ticket = Ticket(title='Erro', user_id=users['requester'])
+        db.session.add(ticket)
+        db.session.commit()
+        first = attach(ticket.id, users['requester'])
+        second = attach(ticket.id, users['requester'])
+
+        digest = remove_attachment(first)
+        db.session.commit()
+        assert collect_blobs([digest]) == 0
+        assert ref_count() == 1 and os.path.exists(blob_path(app))
+
+        remove_attachment(second)
+        db.session.commit()
+        assert collect_blobs([digest]) == 1
+        assert ref_count() is None
+        assert not os.path.exists(blob_path(app))
+
+
+def test_sweep_removes_files_without_a_blob_row(app, users):
+    with app.app_context():
+        ticket = Ticket(title='Erro', user_id=users['requester'])
+        db.session.add(ticket)
+        db.session.commit()
+        attach(ticket.id, users['requester'])
+
+        # Arquivo de um upload cujo commit falhou: está em disco, mas não no banco
+        orphan_digest = hashlib.sha256(b'perdido').hexdigest()
+        os.makedirs(os.path.dirname(blob_path(app, orphan_digest)), exist_ok=True)
+        with open(blob_path(app, orphan_digest), 'wb') as orphan:
+            orphan.write(b'perdido')
+
+        stats = sweep_storage(grace_seconds=-1)
+        assert stats['orphan_files'] == 1
+        assert not os.path.exists(blob_path(app, orphan_digest))
+        assert os.path.exists(blob_path(app))
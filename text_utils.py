@@ -0,0 +1,16 @@
+import re
+import unicodedata
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def normalize_text(text: str) -> str:
+    """Remove acentos e aplica case-folding (ex: "Não Liga" -> "nao liga")."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    without_accents = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return without_accents.casefold()
+
+
+def tokenize(text: str) -> list:
+    """Quebra o texto normalizado em palavras."""
+    return _TOKEN_RE.findall(normalize_text(text))
@@ -0,0 +1,92 @@
+import os
+import shutil
+import subprocess
+import threading
+from storage_service import THUMBNAIL_SUFFIX, PARTIAL_SUFFIX
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow é opcional: sem ele, só os PDFs (via pdftoppm) ganham miniatura
+    Image = ImageOps = None
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+PDF_RENDER_TIMEOUT = 30  # Segundos para o pdftoppm renderizar a primeira página
+# PNG e GIF não têm decodificação reduzida: um arquivo de poucos MB pode abrir 100 MP (centenas de MB de RAM)
+DEFAULT_MAX_PIXELS = 25_000_000
+
+
+def _extension(filename: str) -> str:
+    return filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+
+
+def thumbnail_path(file_path: str) -> str:
+    """A miniatura fica ao lado do arquivo original (blobs/ab/cd/<sha256>.thumb.jpg)."""
+    return file_path + THUMBNAIL_SUFFIX
+
+
+def supports_thumbnail(filename: str) -> bool:
+    """Se há ferramenta instalada para gerar a miniatura desse tipo de arquivo."""
+    extension = _extension(filename)
+    if extension in IMAGE_EXTENSIONS:
+        return Image is not None
+    return extension == 'pdf' and shutil.which('pdftoppm') is not None
+
+
+def _render_image(source: str, target: str, size: int, max_pixels: int):
+    with Image.open(source) as image:
+        image.draft('RGB', (size, size))  # JPEG: decodifica já reduzido, sem abrir a imagem inteira
+        # Até aqui só o cabeçalho foi lido; 'size' já é o tamanho que vai ser decodificado
+        width, height = image.size
+        if width * height > max_pixels:
+            raise ValueError(f"imagem grande demais para miniatura ({width}x{height} pixels)")
+        image = ImageOps.exif_transpose(image)  # Fotos de celular vêm giradas pela orientação do EXIF
+        image.thumbnail((size, size))
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.save(target, 'JPEG', quality=80, optimize=True)
+
+
+def _render_pdf(source: str, target: str, size: int):
+    # Primeira página já no tamanho final; o pdftoppm acrescenta ".jpg" ao prefixo de saída
+    prefix = target[:-len('.jpg')]
+    subprocess.run(['pdftoppm', '-f', '1', '-l', '1', '-singlefile', '-jpeg', '-scale-to', str(size),
+                    source, prefix], check=True, capture_output=True, timeout=PDF_RENDER_TIMEOUT)
+
+
+def generate_thumbnail(file_path: str, filename: str, size: int, max_pixels: int = DEFAULT_MAX_PIXELS) -> bool:
+    """
+    Gera a miniatura JPEG (lado maior = 'size') do anexo em 'file_path', se ainda não existir.
+    'filename' é o nome original (define o tipo). Imagens com mais de 'max_pixels' a decodificar são recusadas
+    (ValueError). Retorna True se a miniatura existe ao final.
+    """
+    target = thumbnail_path(file_path)
+    if os.path.exists(target):
+        return True  # Mesmo conteúdo já enviado antes: a miniatura do blob é reaproveitada
+    if not supports_thumbnail(filename):
+        return False
+
+    # Escreve num temporário e troca no final: quem estiver servindo a página nunca vê um JPEG pela metade
+    partial = f"{file_path}.{os.getpid()}-{threading.get_ident()}{PARTIAL_SUFFIX}"
+    try:
+        if _extension(filename) == 'pdf':
+            _render_pdf(file_path, partial, size)
+        else:
+            _render_image(file_path, partial, size, max_pixels)
+        os.replace(partial, target)
+        return True
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+def generate_thumbnail_in_background(file_path: str, filename: str, size: int, max_pixels: int = DEFAULT_MAX_PIXELS):
+    """Versão para o pool de threads: erros (arquivo corrompido, imagem enorme, PDF inválido) só são registrados."""
+    try:
+        generate_thumbnail(file_path, filename, size, max_pixels)
+    except Exception as e:
+        print(f"Erro ao gerar miniatura de '{filename}': {e}")
@@ -0,0 +1,107 @@
+import json
+import math
+import os
+from text_utils import tokenize
+
+# Campos do chamado previstos pelo classificador local
+FIELDS = ("category", "priority", "ticket_type")
+
+
+def extract_features(text: str) -> dict:
+    """Pesos TF (log) de unigramas e bigramas do texto normalizado."""
+    tokens = tokenize(text)
+    terms = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    counts = {}
+    for term in terms:
+        counts[term] = counts.get(term, 0) + 1
+    return {term: 1.0 + math.log(count) for term, count in counts.items()}
+
+
+class TicketClassifier:
+    """
+    Classificador TF-IDF + Naive Bayes multinomial treinado no histórico de chamados.
+    Prevê categoria, prioridade e tipo em menos de um milissegundo, sem chamar a IA.
+    """
+
+    def __init__(self, idf: dict, models: dict, sample_count: int = 0):
+        self.idf = idf
+        self.models = models  # campo -> {"classes", "log_prior", "log_likelihood"}
+        self.sample_count = sample_count
+
+    @classmethod
+    def train(cls, samples: list, alpha: float = 0.1):
+        """Treina a partir de uma lista de (texto, {"category": ..., "priority": ..., "ticket_type": ...})."""
+        features = [extract_features(text) for text, _ in samples]
+
+        document_frequency = {}
+        for doc in features:
+            for term in doc:
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+        n_docs = len(features)
+        idf = {term: math.log((1 + n_docs) / (1 + df)) + 1.0 for term, df in document_frequency.items()}
+
+        vectors = [cls._tfidf(doc, idf) for doc in features]
+        vocabulary_size = len(idf)
+
+        models = {}
+        for field in FIELDS:
+            classes = sorted({labels[field] for _, labels in samples})
+            class_index = {label: i for i, label in enumerate(classes)}
+            class_docs = [0] * len(classes)
+            class_totals = [0.0] * len(classes)
+            term_weights = {}  # termo -> peso acumulado por classe
+
+            for vector, (_, labels) in zip(vectors, samples):
+                c = class_index[labels[field]]
+                class_docs[c] += 1
+                for term, weight in vector.items():
+                    term_weights.setdefault(term, [0.0] * len(classes))[c] += weight
+                    class_totals[c] += weight
+
+            denominators = [total + alpha * vocabulary_size for total in class_totals]
+            models[field] = {
+                "classes": classes,
+                "log_prior": [math.log(count / n_docs) for count in class_docs],
+                "log_likelihood": {
+                    term: [round(math.log((weights[c] + alpha) / denominators[c]), 5) for c in range(len(classes))]
+                    for term, weights in term_weights.items()
+                }
+            }
+
+        return cls(idf, models, sample_count=n_docs)
+
+    @staticmethod
+    def _tfidf(doc: dict, idf: dict) -> dict:
+        vector = {term: tf * idf[term] for term, tf in doc.items() if term in idf}
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        return {term: v / norm for term, v in vector.items()} if norm else {}
+
+    def predict(self, text: str) -> dict:
+        """Retorna {campo: (rótulo, confiança)} para cada campo do chamado."""
+        vector = self._tfidf(extract_features(text), self.idf)
+        predictions = {}
+        for field, model in self.models.items():
+            scores = list(model["log_prior"])
+            for term, weight in vector.items():  # O vetor só tem termos do vocabulário de treino
+                for c, value in enumerate(model["log_likelihood"][term]):
+                    scores[c] += weight * value
+
+            # Softmax sobre os log-scores para obter a confiança da classe vencedora
+            best = max(range(len(scores)), key=scores.__getitem__)
+            total = sum(math.exp(score - scores[best]) for score in scores)
+            predictions[field] = (model["classes"][best], 1.0 / total)
+        return predictions
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"idf": self.idf, "models": self.models, "sample_count": self.sample_count},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, path)  # Troca atômica: workers nunca leem um arquivo pela metade
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["idf"], data["models"], sample_count=data.get("sample_count", 0))
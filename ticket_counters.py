@@ -0,0 +1,84 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, Ticket, TicketCounter, CLOSED_STATUSES, open_ticket_filter
+GLOBAL_OWNER_ID = 0
+
+
+def ticket_counter_state(ticket):
+    """Campos do chamado que afetam os contadores; guarde antes de alterar o chamado."""
+    return ticket.user_id, ticket.status, ticket.responsible_user_id, ticket.parent_id
+
+
+def _counter_keys(state):
+    """Contadores (scope, owner_id, name) em que um chamado nesse estado entra."""
+    if state is None:
+        return set()
+    user_id, status, responsible_user_id, parent_id = state
+    is_open = status not in CLOSED_STATUSES
+    keys = {('user', user_id, 'total'), ('user', user_id, 'open' if is_open else 'resolved')}
+    if is_open and parent_id is None:  # Chamados vinculados não entram na fila dos agentes
+        if responsible_user_id is None:
+            keys.add(('global', GLOBAL_OWNER_ID, 'unassigned_open'))
+        else:
+            keys.add(('agent', responsible_user_id, 'assigned_open'))
+    return keys
+
+
+def _increment(scope, owner_id, name, delta):
+    values = dict(scope=scope, owner_id=owner_id, name=name, value=delta)
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        statement = insert(TicketCounter).values(**values).on_conflict_do_update(
+            index_elements=['scope', 'owner_id', 'name'],
+            set_={'value': TicketCounter.value + delta})
+        db.session.execute(statement)
+        return
+
+    updated = TicketCounter.query.filter_by(scope=scope, owner_id=owner_id, name=name) \
+        .update({TicketCounter.value: TicketCounter.value + delta}, synchronize_session=False)
+    if not updated:
+        db.session.add(TicketCounter(**values))
+
+
+def update_ticket_counters(before, after):
+    """
+    Aplica a mudança de estado de um chamado aos contadores, na transação atual
+    (before=None para chamado novo). Os contadores são confirmados junto com o chamado no commit.
+    """
+    old_keys, new_keys = _counter_keys(before), _counter_keys(after)
+    for key in old_keys - new_keys:
+        _increment(*key, -1)
+    for key in new_keys - old_keys:
+        _increment(*key, 1)
+
+
+def get_counters(scope, owner_id=GLOBAL_OWNER_ID):
+    """Retorna {nome: valor} dos contadores de um usuário/agente (ou globais)."""
+    rows = db.session.query(TicketCounter.name, TicketCounter.value) \
+        .filter_by(scope=scope, owner_id=owner_id).all()
+    return dict(rows)
+
+
+def rebuild_counters():
+    """Recalcula todos os contadores a partir da tabela de chamados (reparo)."""
+    is_open = open_ticket_filter()
+    in_queue = db.and_(is_open, Ticket.parent_id.is_(None))
+    count = db.func.count(Ticket.id)
+    sources = [
+        ('user', 'total', Ticket.user_id, None),
+        ('user', 'open', Ticket.user_id, is_open),
+        ('user', 'resolved', Ticket.user_id, Ticket.status.in_(CLOSED_STATUSES)),
+        ('agent', 'assigned_open', Ticket.responsible_user_id, db.and_(in_queue, Ticket.responsible_user_id.isnot(None))),
+    ]
+
+    TicketCounter.query.delete()
+    for scope, name, owner_column, condition in sources:
+        query = db.session.query(owner_column, count)
+        if condition is not None:
+            query = query.filter(condition)
+        for owner_id, value in query.group_by(owner_column).all():
+            db.session.add(TicketCounter(scope=scope, owner_id=owner_id, name=name, value=value))
+
+    unassigned = Ticket.query.filter(in_queue, Ticket.responsible_user_id.is_(None)).count()
+    db.session.add(TicketCounter(scope='global', owner_id=GLOBAL_OWNER_ID, name='unassigned_open', value=unassigned))
+    db.session.commit()
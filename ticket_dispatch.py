@@ -0,0 +1,65 @@
+from datetime import datetime, timezone
+from models import db, Ticket, open_ticket_filter
+from ticket_counters import ticket_counter_state, update_ticket_counters
+
+CLAIMED_STATUS = 'Em Andamento'
+
+
+def dispatch_order():
+    """Ordem de atendimento da fila: prioridade, depois o chamado mais antigo."""
+    return Ticket.priority.asc(), Ticket.created_at.asc(), Ticket.id.asc()
+
+
+def claim_tickets(agent_id: int, limit: int = 1, ticket_id: int = None):
+    """
+    Atribui ao agente os próximos 'limit' chamados sem responsável (ou só o 'ticket_id' informado)
+    num único UPDATE condicional: a linha só muda se ainda estiver sem responsável, então dois
+    agentes nunca ficam com o mesmo chamado. No PostgreSQL, SKIP LOCKED faz agentes simultâneos
+    pularem as linhas já disputadas em vez de esperar por elas; no SQLite o UPDATE já é serializado.
+    Não faz commit. Retorna os IDs assumidos (lista vazia se a fila acabou ou o chamado já tinha dono).
+    """
+    unassigned = db.and_(Ticket.responsible_user_id.is_(None), Ticket.parent_id.is_(None), open_ticket_filter())
+    candidates = db.select(Ticket.id).where(unassigned)
+    if ticket_id is not None:
+        candidates = candidates.where(Ticket.id == ticket_id)
+    candidates = candidates.order_by(*dispatch_order()).limit(limit).with_for_update(skip_locked=True)
+
+    statement = db.update(Ticket) \
+        .where(Ticket.id.in_(candidates), unassigned) \
+        .values(responsible_user_id=agent_id, status=CLAIMED_STATUS, updated_at=datetime.now(timezone.utc)) \
+        .returning(Ticket.id, Ticket.user_id) \
+        .execution_options(synchronize_session=False)
+    claimed = db.session.execute(statement).all()
+
+    for claimed_id, user_id in claimed:
+        # O chamado saiu de "aberto sem responsável" (qualquer status aberto conta igual nos contadores)
+        update_ticket_counters((user_id, 'Aberto', None, None), (user_id, CLAIMED_STATUS, agent_id, None))
+    claimed_ids = [claimed_id for claimed_id, _ in claimed]
+    sync_linked_tickets(claimed_ids)
+    return claimed_ids
+
+
+def sync_linked_tickets(parent_ids):
+    """
+    Os chamados vinculados aos 'parent_ids' (relatos do mesmo incidente por outros usuários) recebem o
+    status, o responsável e a data de resolução do principal; os já fechados pelo usuário ficam como estão.
+    Não faz commit.
+    """
+    if not parent_ids:
+        return
+    children = Ticket.query.filter(Ticket.parent_id.in_(parent_ids), Ticket.status != 'Fechado').all()
+    if not children:
+        return
+
+    # O UPDATE em massa de claim_tickets não atualiza os objetos já carregados na sessão
+    parents = {parent.id: parent for parent in
+               Ticket.query.filter(Ticket.id.in_(parent_ids)).populate_existing()}
+    now = datetime.now(timezone.utc)
+    for child in children:
+        parent = parents[child.parent_id]
+        counter_state = ticket_counter_state(child)
+        child.status = parent.status
+        child.responsible_user_id = parent.responsible_user_id
+        child.resolved_at = parent.resolved_at
+        child.updated_at = now
+        update_ticket_counters(counter_state, ticket_counter_state(child))
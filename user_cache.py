@@ -0,0 +1,45 @@
+from flask_login import UserMixin
+from cache_utils import TTLCache
+
+
+class UserSnapshot(UserMixin):
+    """Cópia somente leitura dos campos do usuário usados em templates e verificações de permissão."""
+
+    def __init__(self, id, email, first_name, last_name, is_agent):
+        self.id = id
+        self.email = email
+        self.first_name = first_name
+        self.last_name = last_name
+        self.is_agent = is_agent
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.email, user.first_name, user.last_name, user.is_agent)
+
+
+class UserCache:
+    """
+    Cache dos usuários logados (id -> UserSnapshot) para o user_loader do Flask-Login,
+    limitado em tamanho e com TTL curto. Alterações feitas pela aplicação chamam invalidate();
+    mudanças por fora (ex: outro processo) aparecem em no máximo 'ttl' segundos.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60):
+        self._cache = TTLCache(max_size, ttl)
+
+    def get(self, user_id: int, load):
+        """Retorna o snapshot do usuário, chamando load(user_id) -> User só quando não está em cache."""
+        snapshot = self._cache.get(user_id)
+        if snapshot is None:
+            user = load(user_id)
+            if user is None:
+                return None
+            snapshot = UserSnapshot.from_user(user)
+            self._cache.set(user_id, snapshot)
+        return snapshot
+
+    def invalidate(self, user_id: int):
+        self._cache.pop(user_id)
+
+    def stats(self) -> dict:
+        return self._cache.stats()